@@ -2,28 +2,61 @@
 
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import os
 
 # 1. Vault URL from environment variable (or fallback)
 VAULT_URL = os.getenv("AZURE_KEY_VAULT_URI", "https://providergpt-kv.vault.azure.net/")
 
-# 2. Azure credential - auto-auth from CLI, VS Code, or managed identity
-credential = DefaultAzureCredential()
+# 2. Settings exposed as module attributes → Key Vault secret names.
+#    Nothing is fetched at import; each secret is read on first access
+#    (e.g. settings.OPENAI_KEY) and cached for the process lifetime.
+SECRET_NAMES = {
+    # ---- Azure Form Recognizer ----
+    "AZURE_ENDPOINT": "formRecognizerEndpoint",
+    "AZURE_KEY": "formRecognizerKey",
+    # ---- Azure OpenAI ----
+    "OPENAI_ENDPOINT": "openaiEndpoint",
+    "OPENAI_KEY": "openaiKey",
+    "OPENAI_API_VERSION": "openaiApiVersion",
+    "OPENAI_CHAT_DEPLOYMENT": "openaiChatDeployment",
+    "OPENAI_EMBEDDING_DEPLOYMENT": "openaiEmbeddingDeployment",
+}
 
-# 3. Create Key Vault client
-client = SecretClient(vault_url=VAULT_URL, credential=credential)
 
-# 4. Load secrets
-try:
-    AZURE_ENDPOINT = client.get_secret("formRecognizerEndpoint").value
-    AZURE_KEY = client.get_secret("formRecognizerKey").value
+# 3. Key Vault client (auto-auth from CLI, VS Code, or managed identity)
+@lru_cache(maxsize=1)
+def get_secret_client() -> SecretClient:
+    return SecretClient(vault_url=VAULT_URL, credential=DefaultAzureCredential())
 
-        # ---- Azure OpenAI ----
-    OPENAI_ENDPOINT = client.get_secret("openaiEndpoint").value
-    OPENAI_KEY = client.get_secret("openaiKey").value
-    OPENAI_API_VERSION = client.get_secret("openaiApiVersion").value
-    OPENAI_CHAT_DEPLOYMENT = client.get_secret("openaiChatDeployment").value
-    OPENAI_EMBEDDING_DEPLOYMENT = client.get_secret("openaiEmbeddingDeployment").value
-except Exception as e:
-    raise RuntimeError("Failed to load Azure Form Recognizer credentials: " + str(e))
 
+# 4. Cached secret accessor
+@lru_cache(maxsize=None)
+def get_secret(name: str) -> str:
+    try:
+        return get_secret_client().get_secret(name).value
+    except Exception as e:
+        raise RuntimeError(f"Failed to load secret '{name}' from Azure Key Vault: {e}") from e
+
+
+def preload(extra_names=()):
+    """
+    Fetches all known secrets in parallel (one round-trip of latency
+    instead of one per secret). Call once at startup.
+    """
+    names = list(SECRET_NAMES.values()) + list(extra_names)
+    # lru_cache doesn't serialize concurrent first calls: build the client
+    # and acquire its token with one serial fetch, then fan out the rest.
+    get_secret_client()
+    get_secret(names[0])
+    with ThreadPoolExecutor(max_workers=max(1, len(names) - 1)) as pool:
+        list(pool.map(get_secret, names[1:]))
+
+
+def __getattr__(attr: str):
+    # PEP 562: lazy module attributes
+    name = SECRET_NAMES.get(attr)
+    if name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+    return get_secret(name)
@@ -1,61 +1,48 @@
 # app/rag/ask_api.py
 
-import os
+import json
+import asyncio
+import logging
 import numpy as np
-import faiss
 from pathlib import Path
 from fastapi import APIRouter, Request
-from openai import AzureOpenAI
+from fastapi.responses import StreamingResponse
 from app.config import settings
-import glob
+from app.services.openai_client import get_async_openai_client
+from app.rag.query_embed import embed_query, normalize_query
+from app.rag.cache import ANSWER_CACHE
+from app.rag.chunk_store import chunks_exist
+from app.rag.vector_store_faiss import (
+    list_index_ids,
+    load_faiss_index,
+    load_index_files,
+    normalize_rows,
+    search,
+    to_similarity,
+)
 
 router = APIRouter(tags=["RAG - Ask"], prefix="")  # No /rag prefix here
+logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------
 # FAISS Index Directory
 # ------------------------------------------------------------
-INDEX_DIR = Path("app/data/faiss_store")
-INDEX_DIR.mkdir(parents=True, exist_ok=True)
-
-# ------------------------------------------------------------
-# Helper: Load FAISS index and chunks
-# ------------------------------------------------------------
-import glob
-
-def load_faiss_index(doc_id: str):
-    index_path = os.path.join(INDEX_DIR, f"{doc_id}.index")
-    chunk_path = os.path.join(INDEX_DIR, f"{doc_id}_chunks.npy")
-
-    # 🔍 Search recursively if not found
-    if not os.path.exists(index_path) or not os.path.exists(chunk_path):
-        matches = glob.glob(os.path.join(INDEX_DIR, "**", f"{doc_id}.index"), recursive=True)
-        if matches:
-            index_path = matches[0]
-            chunk_path = index_path.replace(".index", "_chunks.npy")
-            print(f"✅ Found FAISS index for {doc_id} at {index_path}")
-        else:
-            print(f"⚠️ No FAISS index found for {doc_id}")
-            return None, None
-
-    index = faiss.read_index(index_path)
-    chunks = np.load(chunk_path, allow_pickle=True)
-    return index, chunks
-
-
+INDEX_DIR = Path("app/data/faiss_store")  # created by the first save
 
 
 # ------------------------------------------------------------
 # Helper: Search within one FAISS store
 # ------------------------------------------------------------
-def search_index(index, chunks, query_vec, doc_id, top_k=3):
-    D, I = index.search(np.array([query_vec], dtype="float32"), top_k)
+def search_index(index, chunks, query_vec, doc_id, top_k=3, preset=None):
+    """query_vec: (1, dim) float32, L2-normalized once per request."""
+    D, I = search(index, query_vec, top_k, preset)
     results = []
-    for score, idx in zip(D[0], I[0]):
+    for score, idx in zip(to_similarity(index, D[0]), I[0]):
         if 0 <= idx < len(chunks):
             results.append({
                 "doc_id": doc_id,
                 "chunk_id": f"{doc_id}#{idx}",
-                "score": float(1 - score / 2),  # distance → similarity
+                "score": float(score),
                 "text": chunks[idx],
             })
     return results
@@ -64,22 +51,99 @@ def search_index(index, chunks, query_vec, doc_id, top_k=3):
 # ------------------------------------------------------------
 # Helper: Search across all FAISS indices (fallback)
 # ------------------------------------------------------------
-def global_search(query_vec, top_k=3):
-    all_results = []
-    for fname in os.listdir(INDEX_DIR):
-        if not fname.endswith(".index"):
-            continue
-        doc_id = fname.replace(".index", "")
-        index_path = INDEX_DIR / fname
-        chunk_path = INDEX_DIR / f"{doc_id}_chunks.npy"
-        index, chunks = load_faiss_index(index_path, chunk_path)
-        if not index:
-            continue
-        all_results.extend(search_index(index, chunks, query_vec, doc_id, top_k))
+# FAISS releases the GIL inside search, so per-index searches run
+# truly in parallel on worker threads. Cap the fan-out per request.
+SEARCH_FANOUT = 8
+
+
+def _load_and_search(doc_id, query_vec, top_k, preset=None):
+    index, chunks = load_faiss_index(doc_id)
+    if index is None:
+        return []
+    return search_index(index, chunks, query_vec, doc_id, top_k, preset)
+
+
+async def global_search(query_vec, top_k=3, preset=None):
+    doc_ids = list_index_ids(top_level_only=True)
+    fanout = asyncio.Semaphore(SEARCH_FANOUT)
+
+    async def _search_one(doc_id):
+        async with fanout:
+            return await asyncio.to_thread(_load_and_search, doc_id, query_vec, top_k, preset)
+
+    batches = await asyncio.gather(*(_search_one(doc_id) for doc_id in doc_ids))
+    all_results = [r for batch in batches for r in batch]
     all_results.sort(key=lambda x: x["score"], reverse=True)
     return all_results[:top_k]
 
 
+# ------------------------------------------------------------
+# Helper: Server-Sent Events stream of the GPT answer
+# ------------------------------------------------------------
+SYSTEM_PROMPT = (
+    "You are a specialized AI risk analyst. "
+    "Answer **only** using the provided context from risk intelligence data and documents. "
+    "If the context does not include relevant data, clearly state that."
+)
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def replay_answer(metadata: dict, answer: str):
+    """Replays a cached answer with the same SSE framing as a live one."""
+    yield _sse(metadata, event="metadata")
+    yield _sse({"delta": answer})
+    yield _sse({}, event="done")
+
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+def build_user_prompt(context_chunks: list[str], question: str) -> str:
+    """Context chunks joined once, then the question."""
+    context = CONTEXT_SEPARATOR.join(context_chunks)
+    return f"Context:\n{context}\n\nQuestion: {question}"
+
+
+async def stream_answer(question: str, context_chunks: list[str], metadata: dict, cache_key=None):
+    """
+    Yields SSE frames: one `metadata` event (sources + previews),
+    then a `data` frame per token delta, then `done` (or `error`).
+    Completed answers are stored in ANSWER_CACHE under cache_key.
+    """
+    yield _sse(metadata, event="metadata")
+    user_prompt = build_user_prompt(context_chunks, question)
+    parts = []
+    try:
+        stream = await get_async_openai_client().chat.completions.create(
+            model=settings.OPENAI_CHAT_DEPLOYMENT,
+            temperature=0.2,
+            stream=True,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+        async for chunk in stream:
+            try:
+                content = chunk.choices[0].delta.content
+            except (AttributeError, IndexError, TypeError):
+                continue  # e.g. the content-filter preamble has no choices
+            if content:
+                parts.append(content)
+                yield _sse({"delta": content})
+        logger.debug("✅ Answer streamed successfully.")
+        if cache_key is not None:
+            ANSWER_CACHE.set(cache_key, (metadata, "".join(parts)))
+        yield _sse({}, event="done")
+    except Exception as e:
+        logger.error("❌ GPT streaming failed: %s", e)
+        yield _sse({"error": f"❌ GPT request failed: {str(e)}"}, event="error")
+
+
 # ------------------------------------------------------------
 # Endpoint: Ask (RAG + GPT)
 # ------------------------------------------------------------
@@ -89,96 +153,82 @@ async def ask_docs(query: dict, request: Request = None):
     Document-grounded Q&A using:
       1. Risk-aware FAISS retrieval (if query mentions risk)
       2. GPT-4o-mini for grounded, explainable answers
+    The answer is streamed as Server-Sent Events (metadata first).
     """
     question = query.get("query", "").strip()
     provider_id = query.get("provider_id", "").strip()
     top_k = int(query.get("top_k", 3))
+    preset = query.get("search_mode")  # optional "fast" / "accurate"
 
     if not question:
         return {"error": "❌ Missing query text."}
 
-    print(f"🔍 Received query: '{question}' (provider={provider_id or 'global'})")
-
-    # Initialize OpenAI client
-    client = AzureOpenAI(
-        api_key=settings.OPENAI_KEY,
-        api_version=settings.OPENAI_API_VERSION,
-        azure_endpoint=settings.OPENAI_ENDPOINT,
-    )
+    logger.info("🔍 Received query: '%s' (provider=%s)", question, provider_id or 'global')
+
+    # Step 0️⃣ Exact-match answer cache (invalidated on provider ingest)
+    cache_key = (normalize_query(question), provider_id, top_k, preset)
+    cached = ANSWER_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("⚡ Answer cache hit.")
+        return StreamingResponse(
+            replay_answer(*cached),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     # Step 1️⃣ Embed query
     try:
-        query_emb = client.embeddings.create(
-            input=question,
-            model=settings.OPENAI_EMBEDDING_DEPLOYMENT
-        ).data[0].embedding
+        query_emb = await embed_query(question)
     except Exception as e:
         return {"error": f"❌ Failed to embed query: {str(e)}"}
 
+    # One (1, dim) buffer shared by every FAISS search in this request,
+    # normalized like the stored vectors so inner product == cosine.
+    query_vec = np.array(query_emb, dtype=np.float32).reshape(1, -1)  # copy: cached vector
+    normalize_rows(query_vec)
+
     query_lower = question.lower()
     results = []
 
     # Step 2️⃣ Try risk-specific FAISS index first (if applicable)
     if provider_id:
         provider_dir = INDEX_DIR / provider_id
-        risk_index = provider_dir / "index.faiss"
-        chunk_path = provider_dir / "chunks.npy"
+        risk_index = provider_dir / f"{provider_id}.index"
+        chunk_path = provider_dir / f"{provider_id}_chunks.bin"
 
         if any(k in query_lower for k in ["risk", "score", "breakdown", "category", "compliance", "explain"]):
-            if risk_index.exists() and chunk_path.exists():
-                print(f"🧠 Searching risk FAISS for provider {provider_id}...")
-                index, chunks = load_faiss_index(risk_index, chunk_path)
+            if risk_index.exists() and chunks_exist(chunk_path):
+                logger.debug("🧠 Searching risk FAISS for provider %s...", provider_id)
+                index, chunks = await asyncio.to_thread(load_index_files, risk_index, chunk_path)
                 if index:
-                    results = search_index(index, chunks, query_emb, provider_id, top_k)
-                    print(f"✅ Retrieved {len(results)} risk chunks from provider {provider_id}")
+                    results = search_index(index, chunks, query_vec, provider_id, top_k, preset)
+                    logger.debug("✅ Retrieved %s risk chunks from provider %s", len(results), provider_id)
             else:
-                print(f"⚠️ No dedicated risk FAISS found for {provider_id}, falling back to global search.")
+                logger.warning("⚠️ No dedicated risk FAISS found for %s, falling back to global search.", provider_id)
 
     # Step 3️⃣ Fallback to global search if risk index empty or not found
     if not results:
-        print("🌐 Performing global FAISS search...")
-        results = global_search(query_emb, top_k=top_k)
+        logger.debug("🌐 Performing global FAISS search...")
+        results = await global_search(query_vec, top_k=top_k, preset=preset)
 
     if not results:
         return {"answer": "⚠️ No relevant context found.", "sources": [], "context_preview": []}
 
     # Step 4️⃣ Build GPT context
-    context_text = "\n\n---\n\n".join([r["text"] for r in results])
+    context_chunks = [r["text"] for r in results]
     context_preview = [
         {"chunk_id": r["chunk_id"], "score": r["score"], "preview": r["text"][:200]}
         for r in results
     ]
-
-    # Step 5️⃣ Ask GPT with grounded context
-    print(f"💬 Sending {len(results)} context chunks to GPT...")
-    try:
-        completion = client.chat.completions.create(
-            model=settings.OPENAI_CHAT_DEPLOYMENT,
-            temperature=0.2,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a specialized AI risk analyst. "
-                        "Answer **only** using the provided context from risk intelligence data and documents. "
-                        "If the context does not include relevant data, clearly state that."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Context:\n{context_text}\n\nQuestion: {question}"
-                }
-            ],
-        )
-        answer = completion.choices[0].message.content.strip()
-        print("✅ Answer generated successfully.")
-    except Exception as e:
-        return {"error": f"❌ GPT request failed: {str(e)}"}
-
-    # Step 6️⃣ Return structured response
-    return {
-        "answer": answer,
+    metadata = {
         "sources": [{"chunk_id": r["chunk_id"], "score": r["score"]} for r in results],
-        "context_preview": context_preview
+        "context_preview": context_preview,
     }
 
+    # Step 5️⃣ Stream GPT answer (metadata first, then token deltas)
+    logger.debug("💬 Sending %s context chunks to GPT...", len(results))
+    return StreamingResponse(
+        stream_answer(question, context_chunks, metadata, cache_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
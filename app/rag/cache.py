@@ -0,0 +1,84 @@
+# app/rag/cache.py
+
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------
+# 🗃️ Small in-process TTL + LRU cache
+# ------------------------------------------------------------
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries expire after `ttl` seconds.
+    Thread-safe so it can be shared between the event loop and
+    worker threads (asyncio.to_thread / FastAPI threadpool).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[object, tuple[float, object]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def pop_where(self, predicate) -> int:
+        """Drops every entry whose key satisfies predicate(key)."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ------------------------------------------------------------
+# 💬 RAG answer cache: (normalized question, provider_id, top_k) → answer
+# ------------------------------------------------------------
+ANSWER_CACHE = TTLCache(maxsize=1024, ttl=900)
+
+
+def invalidate_provider_answers(provider_id: str) -> int:
+    """
+    Forgets cached answers for a provider whose FAISS store changed,
+    plus global-search answers (provider_id ""), which span every store.
+    """
+    dropped = ANSWER_CACHE.pop_where(lambda key: key[1] in (provider_id, ""))
+    if dropped:
+        logger.info("🧹 Invalidated %s cached answer(s) for provider %s", dropped, provider_id)
+    return dropped
@@ -0,0 +1,151 @@
+# app/rag/chunk_store.py
+
+import os
+import mmap
+import numpy as np
+from pathlib import Path
+
+
+# ------------------------------------------------------------
+# 📦 Chunk storage: UTF-8 blob + uint64 offsets (no pickle)
+# ------------------------------------------------------------
+# {doc_id}_chunks.bin      concatenated UTF-8 chunk bytes
+# {doc_id}_chunks_off.npy  uint64 offsets, len(chunks) + 1 entries
+# Same layout as an Arrow string column; strings are decoded only
+# when a search hit asks for them.
+OFFSETS_SUFFIX = "_off.npy"
+LEGACY_SUFFIX = ".npy"
+
+
+def offsets_path_for(chunk_path) -> Path:
+    chunk_path = Path(chunk_path)
+    return chunk_path.with_name(chunk_path.stem + OFFSETS_SUFFIX)
+
+
+def legacy_path_for(chunk_path) -> Path:
+    """Pre-blob layout: pickled object array ({doc_id}_chunks.npy)."""
+    return Path(chunk_path).with_suffix(LEGACY_SUFFIX)
+
+
+def chunks_exist(chunk_path) -> bool:
+    return offsets_path_for(chunk_path).exists() or legacy_path_for(chunk_path).exists()
+
+
+def file_signature(path) -> tuple[int, int]:
+    """(mtime_ns, size): changes on any rewrite, even within one mtime tick."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def chunks_signature(chunk_path) -> tuple[int, int]:
+    """Signature of the file written last, used as the cache key."""
+    try:
+        return file_signature(offsets_path_for(chunk_path))  # one stat on the hot path
+    except FileNotFoundError:
+        return file_signature(legacy_path_for(chunk_path))
+
+
+def _encode(chunks) -> tuple[bytes, np.ndarray]:
+    encoded = [str(c).encode("utf-8") for c in chunks]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.uint64, count=len(encoded))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum(lengths, out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def _replace_offsets(offsets_path: Path, offsets: np.ndarray):
+    tmp = offsets_path.with_name(offsets_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, offsets)
+    os.replace(tmp, offsets_path)
+
+
+# ------------------------------------------------------------
+# ✍️ Writers
+# ------------------------------------------------------------
+def write_chunks(chunks, chunk_path):
+    """Writes a fresh chunk table (blob first, offsets last)."""
+    chunk_path = Path(chunk_path)
+    blob, offsets = _encode(chunks)
+    tmp = chunk_path.with_name(chunk_path.name + ".tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, chunk_path)
+    _replace_offsets(offsets_path_for(chunk_path), offsets)
+    legacy = legacy_path_for(chunk_path)
+    if legacy.exists():
+        legacy.unlink()
+
+
+def append_chunks(chunks, chunk_path):
+    """
+    Appends chunks in O(new) blob bytes. Offsets are swapped in
+    atomically afterwards, so readers never see a partial table.
+    """
+    chunk_path = Path(chunk_path)
+    offsets_path = offsets_path_for(chunk_path)
+    if not offsets_path.exists():
+        return write_chunks(list(read_chunks(chunk_path)) + list(chunks), chunk_path)
+
+    existing = np.load(offsets_path)
+    blob, offsets = _encode(chunks)
+    with open(chunk_path, "ab") as f:
+        f.truncate(int(existing[-1]))  # drop bytes of any interrupted append
+        f.write(blob)
+    _replace_offsets(offsets_path, np.concatenate([existing, offsets[1:] + existing[-1]]))
+
+
+def truncate_chunks(chunk_path, n: int):
+    """Rolls the table back to its first n chunks (undoes a failed append)."""
+    offsets_path = offsets_path_for(chunk_path)
+    _replace_offsets(offsets_path, np.load(offsets_path)[: n + 1])
+
+
+# ------------------------------------------------------------
+# 📖 Reader
+# ------------------------------------------------------------
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a chunk table.
+    Supports len(), integer indexing (decodes one chunk) and slicing.
+    """
+
+    def __init__(self, chunk_path):
+        chunk_path = Path(chunk_path)
+        self.offsets = np.load(offsets_path_for(chunk_path), mmap_mode="r")
+        size = int(self.offsets[-1])
+        if size:
+            with open(chunk_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._data[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self) -> list[str]:
+        return list(self)
+
+
+def read_chunks(chunk_path):
+    """
+    Opens a chunk table. Falls back to the legacy pickled .npy
+    for stores written before the blob layout.
+    """
+    if offsets_path_for(chunk_path).exists():
+        return ChunkStore(chunk_path)
+    return np.load(legacy_path_for(chunk_path), allow_pickle=True)
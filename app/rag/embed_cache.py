@@ -0,0 +1,116 @@
+# app/rag/embed_cache.py
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+
+# Prefer BLAKE3 when installed; BLAKE2b (stdlib) otherwise
+try:
+    from blake3 import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------
+# Content-addressed embedding cache (text + model → float32 vector)
+# ------------------------------------------------------------
+EMBED_CACHE_DIR = Path("app/data/embed_cache")
+EMBED_CACHE_PATH = EMBED_CACHE_DIR / "embeddings.sqlite"
+_SQL_BATCH = 500  # keys per SELECT (SQLite variable limit)
+
+
+def cache_key(text: str, model: str) -> bytes:
+    data = text.encode("utf-8")
+    if HAS_BLAKE3:
+        digest = blake3(data).digest()
+    else:
+        digest = hashlib.blake2b(data, digest_size=32).digest()
+    return digest + model.encode("utf-8")
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed map of cache_key → raw float32 bytes (no pickle).
+    Opened on first use; safe to share between threads.
+    """
+
+    def __init__(self, path: Path = EMBED_CACHE_PATH):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        found = {}
+        if not keys:
+            return found
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(keys), _SQL_BATCH):
+                part = keys[i:i + _SQL_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                )
+                for key, vec in rows:
+                    found[key] = np.frombuffer(vec, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: list[bytes], vectors) -> int:
+        """Stores vectors; all-zero rows (failed batches) are never cached."""
+        rows = [
+            (key, np.asarray(vec, dtype=np.float32).tobytes())
+            for key, vec in zip(keys, vectors)
+            if np.any(vec)
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows)
+        return len(rows)
+
+
+EMBED_CACHE = EmbeddingCache()
+
+
+async def get_or_compute_many(texts: list[str], model: str, compute_batch_fn) -> np.ndarray:
+    """
+    Returns vectors for texts in input order. Only cache misses are
+    passed to `compute_batch_fn(list[str]) -> np.ndarray` (awaited).
+    """
+    keys = [cache_key(t, model) for t in texts]
+    hits = EMBED_CACHE.get_many(keys)
+    missing_idx = [i for i, k in enumerate(keys) if k not in hits]
+    if hits:
+        logger.info("⚡ Embedding cache: %s/%s hit(s)", len(texts) - len(missing_idx), len(texts))
+
+    computed = None
+    if missing_idx:
+        computed = await compute_batch_fn([texts[i] for i in missing_idx])
+        EMBED_CACHE.put_many([keys[i] for i in missing_idx], computed)
+
+    dim = computed.shape[1] if computed is not None else len(next(iter(hits.values())))
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    for i, k in enumerate(keys):
+        if k in hits:
+            out[i] = hits[k]
+    if missing_idx:
+        out[missing_idx] = computed
+    return out
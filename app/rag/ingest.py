@@ -2,24 +2,31 @@
 
 import os
 import re
+import logging
 import uuid
+import base64
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from PyPDF2 import PdfReader
-import fitz  # PyMuPDF
-from openai import AzureOpenAI
+from openai import APIConnectionError, AsyncAzureOpenAI, InternalServerError, RateLimitError
 from app.config import settings
-from app.rag.vector_store_faiss import save_faiss_index, load_faiss_index
+from app.services.openai_client import open_async_openai_client
+from app.rag.vector_store_faiss import save_faiss_index, append_faiss_index
+from app.rag.embed_cache import EMBED_CACHE, cache_key, get_or_compute_many
+from concurrent.futures.process import BrokenProcessPool
+from app.rag.pdf_text import (
+    discard_extract_pool,
+    extract_page_range,
+    extract_pages_parallel,
+    extract_pages_pypdf,
+    get_extract_pool,
+    page_count,
+    page_ranges,
+)
 from pathlib import Path
-import faiss  # ✅ for L2 normalization
 
-# ============================================================
-# Azure OpenAI Client
-# ============================================================
-client = AzureOpenAI(
-    api_key=settings.OPENAI_KEY,
-    api_version=settings.OPENAI_API_VERSION,
-    azure_endpoint=settings.OPENAI_ENDPOINT,
-)
+logger = logging.getLogger(__name__)
 
 EMBEDDING_DIM = 1536  # consistent with text-embedding-3-small / Ada v2
 
@@ -28,71 +35,324 @@ EMBEDDING_DIM = 1536  # consistent with text-embedding-3-small / Ada v2
 # ============================================================
 def clean_text(t: str) -> str:
     """Cleans up extra whitespace and newline clutter."""
-    return re.sub(r"\s+", " ", t).strip()
+    # str.split() collapses any whitespace run in one C-level pass
+    # (same character class as regex \s) and drops the ends.
+    return " ".join(t.split())
 
 
-def chunk_text_streaming(page_texts, chunk_size=800, overlap=100):
-    """Splits long text into overlapping chunks for embeddings."""
+def chunk_pages(page_texts, first_page: int = 0, chunk_size=800, overlap=100):
+    """Splits pages into overlapping chunks, tagged with their page index."""
+    step = chunk_size - overlap
     chunks = []
-    for page_text in page_texts:
+    for page_idx, page_text in enumerate(page_texts, start=first_page):
         text = clean_text(page_text)
-        if not text:
-            continue
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += chunk_size - overlap
+        chunks.extend([(page_idx, text[start:start + chunk_size]) for start in range(0, len(text), step)])
     return chunks
 
 
+def chunk_text_streaming(page_texts, chunk_size=800, overlap=100):
+    """Splits long text into overlapping chunks for embeddings."""
+    return [chunk for _, chunk in chunk_pages(page_texts, 0, chunk_size, overlap)]
+
+
 def extract_text_generator(file_path: str):
-    """Yields text per page using PyMuPDF, fallback to PyPDF2."""
+    """Yields text per page using PyMuPDF (parallel), fallback to PyPDF2."""
+    i = 0
     try:
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                yield page.get_text("text")
+        for text in extract_pages_parallel(file_path):
+            yield text
+            i += 1
     except Exception as e:
-        print(f"⚠️ PyMuPDF failed: {e}. Falling back to PyPDF2.")
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            yield page.extract_text() or ""
+        logger.warning("⚠️ PyMuPDF failed: %s. Falling back to PyPDF2.", e)
+        yield from extract_pages_pypdf(file_path, i)
+
+
+EMBED_BATCH_SIZE = 2048     # max inputs per embeddings request (Azure limit)
+EMBED_BATCH_TOKENS = 8192   # approx. token budget per request; binds first for PDF chunks
+EMBED_MAX_CONCURRENCY = 4   # in-flight requests (Azure rate limits)
+EMBED_MAX_RETRIES = 3       # extra attempts per batch on 429 / timeout / 5xx
+# Retried by _embed_batch itself (the SDK's own retries are off for this client)
+EMBED_RETRYABLE = (RateLimitError, APIConnectionError, InternalServerError)
+PIPELINE_QUEUE_SIZE = 4     # extracted page ranges buffered ahead of chunking
+EMBED_FLUSH_INTERVAL = 0.25 # seconds before a partial batch is sent anyway
+
+
+def _open_async_client() -> AsyncAzureOpenAI:
+    # A fresh async client per run: its connection pool is bound to the
+    # event loop, and each embed run may live in its own loop/thread.
+    # max_retries=0: _embed_batch retries itself, so backoffs don't stack.
+    return open_async_openai_client(max_retries=0)
+
 
+def _approx_tokens(text: str) -> int:
+    # ~4 characters per token for English text with cl100k-style tokenizers
+    return len(text) // 4 + 1
 
-def embed_texts(texts, batch_size: int = 20):
+
+def _token_batches(texts, batch_size: int = EMBED_BATCH_SIZE,
+                   max_tokens: int = EMBED_BATCH_TOKENS):
     """
-    Calls Azure OpenAI Embeddings API in safe batches.
-    Used by both PDF ingestion and risk orchestrator (for watchlist embeddings).
+    Groups text indices into batches of similar length: texts are sorted
+    by length and each batch closes at batch_size items or max_tokens
+    (approximate) tokens, whichever comes first.
+    """
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    batches, current, tokens = [], [], 0
+    for i in order:
+        n = _approx_tokens(texts[i])
+        if current and (len(current) >= batch_size or tokens + n > max_tokens):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(int(i))
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _retry_delay(error, attempt: int) -> float:
+    """Server-provided Retry-After (or exponential backoff) plus jitter."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        delay = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        delay = 2.0 ** attempt
+    return delay + random.random() * 0.2
+
+
+async def _embed_batch(aclient, semaphore, n, batch):
+    """
+    Embeds one batch into a (len(batch), EMBEDDING_DIM) float32 array;
+    retries on 429 and transient errors, failed batches become zero vectors.
+    """
+    async with semaphore:
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                response = await aclient.embeddings.create(
+                    input=batch,
+                    model=settings.OPENAI_EMBEDDING_DEPLOYMENT,
+                    encoding_format="base64",
+                )
+                logger.debug("✅ Embedded batch %s (%s items)", n + 1, len(response.data))
+                out = np.empty((len(response.data), EMBEDDING_DIM), dtype="float32")
+                for row, d in enumerate(response.data):
+                    # raw little-endian float32, no JSON float parsing
+                    out[row] = np.frombuffer(base64.b64decode(d.embedding), dtype="<f4")
+                return out
+            except EMBED_RETRYABLE as e:
+                if attempt == EMBED_MAX_RETRIES:
+                    logger.error("❌ Embedding failed for batch %s after retries, giving up: %s", n + 1, e)
+                    break
+                delay = _retry_delay(e, attempt)
+                logger.warning("⏳ %s on batch %s, retrying in %.1fs", type(e).__name__, n + 1, delay)
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error("❌ Embedding failed for batch %s: %s", n + 1, e)
+                await asyncio.sleep(2)  # backoff
+                break
+        # Fill failed batch with zero vectors of correct shape to avoid breaking
+        return np.zeros((len(batch), EMBEDDING_DIM), dtype="float32")
+
+
+async def embed_texts_async(texts, batch_size: int = EMBED_BATCH_SIZE,
+                            max_concurrency: int = EMBED_MAX_CONCURRENCY):
+    """
+    Embeds texts with concurrent Azure OpenAI requests.
+    Batches are sent in parallel (bounded by a semaphore) and the
+    resulting vectors keep the input order. Identical texts are
+    embedded once and their vector is reused; previously embedded
+    texts come from the on-disk embedding cache.
     """
-    import time
     if not texts:
-        print("⚠️ embed_texts() called with empty input.")
-        return np.zeros((0, 1536), dtype="float32")
+        logger.warning("⚠️ embed_texts() called with empty input.")
+        return np.zeros((0, EMBEDDING_DIM), dtype="float32")
+
+    slots = {}
+    inverse = [slots.setdefault(t, len(slots)) for t in texts]
+    unique_texts = list(slots)
+    if len(unique_texts) < len(texts):
+        logger.debug("♻️ Skipping %s duplicate chunk(s)", len(texts) - len(unique_texts))
+
+    async def _embed_uncached(batch_texts):
+        # Length-sorted batches keep each request's token count tight;
+        # rows are scattered back to input order below.
+        batches = _token_batches(batch_texts, batch_size)
+        logger.info("🧠 Embedding %s text chunk(s) via Azure OpenAI (%s batch(es), concurrency=%s)...",
+                    len(batch_texts), len(batches), max_concurrency)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with _open_async_client() as aclient:
+            results = await asyncio.gather(*(
+                _embed_batch(aclient, semaphore, n, [batch_texts[i] for i in idx])
+                for n, idx in enumerate(batches)
+            ))
+        out = np.empty((len(batch_texts), EMBEDDING_DIM), dtype="float32")
+        for idx, vectors in zip(batches, results):
+            out[idx] = vectors
+        return out
+
+    unique_vectors = await get_or_compute_many(
+        unique_texts, settings.OPENAI_EMBEDDING_DEPLOYMENT, _embed_uncached
+    )
+    vectors = unique_vectors[np.asarray(inverse, dtype=np.intp)]
+    logger.debug("✅ All embeddings complete. Final shape: %s", vectors.shape)
+    return vectors
 
-    all_vectors = []
-    total = len(texts)
-    print(f"🧠 Embedding {total} text chunk(s) via Azure OpenAI (batch size={batch_size})...")
 
-    for i in range(0, total, batch_size):
-        batch = texts[i:i + batch_size]
+def _run_sync(coro):
+    """Runs a coroutine to completion from sync code (even inside a running loop)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Called from an async route: drive the coroutine on a helper thread.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def embed_texts(texts, batch_size: int = EMBED_BATCH_SIZE):
+    """
+    Calls Azure OpenAI Embeddings API in concurrent batches.
+    Used by both PDF ingestion and risk orchestrator (for watchlist embeddings).
+    Safe to call from sync code and from inside a running event loop.
+    """
+    return _run_sync(embed_texts_async(texts, batch_size=batch_size))
+
+
+async def _extract_and_embed(file_path: str):
+    """
+    Pipelined ingest: page ranges are extracted in parallel on the
+    process pool and fed (in page order, one item per range) into a
+    bounded queue while full
+    chunk batches are already being embedded, so PDF parsing and Azure
+    round-trips overlap and parsing never blocks the event loop.
+
+    Returns:
+        tuple[list[str], np.ndarray, int]: (chunks, vectors, token_count)
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    file_name = Path(file_path).name
+
+    async def _produce():
+        pool = get_extract_pool()
+        i = 0
+        futures = []
         try:
-            response = client.embeddings.create(
-                input=batch,
-                model=settings.OPENAI_EMBEDDING_DEPLOYMENT,
-            )
-            batch_vectors = [d.embedding for d in response.data]
-            all_vectors.extend(batch_vectors)
-            print(f"✅ Embedded batch {i // batch_size + 1} ({len(batch_vectors)} items)")
+            n_pages = await loop.run_in_executor(pool, page_count, file_path)
+            futures = [
+                loop.run_in_executor(pool, extract_page_range, file_path, start, stop)
+                for start, stop in page_ranges(n_pages)
+            ]
+            for future in futures:
+                page_texts = await future
+                await queue.put((i, page_texts))
+                i += len(page_texts)
         except Exception as e:
-            print(f"❌ Embedding failed for batch {i // batch_size + 1}: {e}")
-            # Fill failed batch with zero vectors of correct shape to avoid breaking
-            all_vectors.extend([[0.0] * 1536 for _ in batch])
-            time.sleep(2)  # backoff
+            logger.warning("⚠️ PyMuPDF failed: %s. Falling back to PyPDF2.", e)
+            if isinstance(e, BrokenProcessPool):
+                discard_extract_pool(pool)
+            for future in futures:
+                future.cancel()  # don't keep workers busy on ranges we won't use
+            page_texts = await asyncio.to_thread(extract_pages_pypdf, file_path, i)
+            await queue.put((i, page_texts))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(_produce())
+    semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+    model = settings.OPENAI_EMBEDDING_DEPLOYMENT
+    all_chunks, pending, tasks = [], [], []
+    # Repeated boilerplate (headers, footers, disclaimers) is embedded
+    # once: chunk body → slot in the unique-vector matrix.
+    slots: dict[str, int] = {}
+    inverse: list[int] = []
+    # Unique chunks already in the embedding cache skip Azure entirely.
+    cached_vectors: dict[int, np.ndarray] = {}
+    pending_slots, task_slots = [], []
+    pending_tokens = 0
+    token_count = 0
 
-    vectors = np.array(all_vectors, dtype="float32")
-    print(f"✅ All embeddings complete. Final shape: {vectors.shape}")
-    return vectors
+    async with _open_async_client() as aclient:
+
+        def _flush():
+            nonlocal pending, pending_slots, pending_tokens
+            tasks.append(asyncio.create_task(
+                _embed_batch(aclient, semaphore, len(tasks), pending)))
+            task_slots.append(pending_slots)
+            pending, pending_slots, pending_tokens = [], [], 0
+
+        try:
+            while True:
+                # A partial batch is flushed if no page arrives in time,
+                # so a slow extractor never leaves Azure idle.
+                try:
+                    if pending:
+                        item = await asyncio.wait_for(queue.get(), EMBED_FLUSH_INTERVAL)
+                    else:
+                        item = await queue.get()
+                except asyncio.TimeoutError:
+                    _flush()
+                    continue
+                if item is None:
+                    break
+
+                first_page, page_texts = item
+                logger.debug("📄 Processing pages %s-%s", first_page + 1, first_page + len(page_texts))
+                new_slots, new_texts = [], []
+                for i, text in chunk_pages(page_texts, first_page):
+                    all_chunks.append(f"Document: {file_name} | Page: {i + 1}\n\n{text}")
+                    slot = slots.get(text)
+                    if slot is None:
+                        slot = slots[text] = len(slots)
+                        new_slots.append(slot)
+                        new_texts.append(all_chunks[-1])
+                    inverse.append(slot)
+                token_count += sum(len(page_text.split()) for page_text in page_texts)
+
+                keys = [cache_key(t, model) for t in new_texts]
+                hits = EMBED_CACHE.get_many(keys)
+                for slot, text, key in zip(new_slots, new_texts, keys):
+                    if key in hits:
+                        cached_vectors[slot] = hits[key]
+                    else:
+                        n_tokens = _approx_tokens(text)
+                        if pending and pending_tokens + n_tokens > EMBED_BATCH_TOKENS:
+                            _flush()
+                        pending.append(text)
+                        pending_slots.append((slot, key))
+                        pending_tokens += n_tokens
+                        if len(pending) >= EMBED_BATCH_SIZE:
+                            _flush()
+
+            if pending:
+                _flush()
+        finally:
+            # Unblock the producer if we bailed out early.
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            await producer
+
+        results = await asyncio.gather(*tasks)
+
+    if len(slots) < len(all_chunks):
+        logger.info("♻️ Reused embeddings for %s duplicate chunk(s)", len(all_chunks) - len(slots))
+    if cached_vectors:
+        logger.info("⚡ Embedding cache: %s/%s hit(s)", len(cached_vectors), len(slots))
+
+    unique_vectors = np.zeros((len(slots), EMBEDDING_DIM), dtype="float32")
+    for slot, vec in cached_vectors.items():
+        unique_vectors[slot] = vec
+    for batch_slots, batch_vectors in zip(task_slots, results):
+        unique_vectors[[slot for slot, _ in batch_slots]] = batch_vectors
+        EMBED_CACHE.put_many([key for _, key in batch_slots], batch_vectors)
+
+    vectors = unique_vectors[np.asarray(inverse, dtype=np.intp)]
+    return all_chunks, vectors, token_count
 
 
 # ============================================================
@@ -112,7 +372,7 @@ def ingest_pdf(file_path: str, provider_id: str, doc_name: str = None, append: b
     Returns:
         tuple[list[str], int]: (chunks, total_token_count)
     """
-    print(f"🚀 Starting ingestion for provider: {provider_id} ({'append' if append else 'overwrite'})")
+    logger.info("🚀 Starting ingestion for provider: %s (%s)", provider_id, "append" if append else "overwrite")
     all_chunks = []
     token_count = 0
 
@@ -120,64 +380,38 @@ def ingest_pdf(file_path: str, provider_id: str, doc_name: str = None, append: b
     doc_id = f"{safe_name}_{uuid.uuid4().hex[:6]}"
 
     try:
-        # Step 1️⃣ Extract and chunk PDF
-        for i, page_text in enumerate(extract_text_generator(file_path)):
-            if not page_text.strip():
-                continue
-
-            print(f"📄 Processing page {i + 1}")
-            chunks = chunk_text_streaming([page_text])
-            enriched_chunks = [
-                f"Document: {Path(file_path).name} | Page: {i + 1}\n\n{text}"
-                for text in chunks
-            ]
-            all_chunks.extend(enriched_chunks)
-            token_count += len(page_text.split())
+        # Step 1️⃣ + 2️⃣ Extract, chunk and embed (overlapped pipeline)
+        all_chunks, new_vectors, token_count = _run_sync(_extract_and_embed(file_path))
 
-        print(f"✅ Total chunks created: {len(all_chunks)}, Tokens: {token_count}")
+        logger.info("✅ Total chunks created: %s, Tokens: %s", len(all_chunks), token_count)
 
         if not all_chunks:
-            print("⚠️ No valid chunks extracted; skipping embedding.")
+            logger.warning("⚠️ No valid chunks extracted; skipping embedding.")
             return [], token_count
 
-        # Step 2️⃣ Embed new text chunks
-        new_vectors = embed_texts(all_chunks)
-        faiss.normalize_L2(new_vectors)
-
         provider_dir = Path("app/data/faiss_store") / provider_id
         provider_dir.mkdir(parents=True, exist_ok=True)
 
-        # Step 3️⃣ Merge with existing FAISS data if append=True
-        existing_vectors, existing_chunks = None, []
-        if append:
-            try:
-                existing_vectors, existing_chunks = load_faiss_index(str(provider_dir))
-                if existing_vectors is not None:
-                    print(f"🔁 Merging {len(existing_vectors)} existing vectors with {len(new_vectors)} new ones...")
-                    all_chunks = existing_chunks + all_chunks
-                    new_vectors = np.concatenate([existing_vectors, new_vectors], axis=0)
-            except Exception as e:
-                print(f"⚠️ No existing FAISS index found or failed to load: {e}")
-
-        # Step 4️⃣ Save combined FAISS data
-        save_faiss_index(
+        # Step 3️⃣ Add to the provider's FAISS store (incremental when append=True)
+        store = append_faiss_index if append else save_faiss_index
+        store(
             vectors=new_vectors,
             chunks=all_chunks,
             doc_id=provider_id,  # Use provider_id as global key
             provider_dir=str(provider_dir)
         )
-        print(f"💾 Saved FAISS index for {provider_id} ({len(all_chunks)} chunks total)")
+        logger.info("💾 Saved FAISS index for %s (+%s chunks)", provider_id, len(all_chunks))
 
     except Exception as e:
-        print(f"❌ Error during ingestion: {e}")
+        logger.error("❌ Error during ingestion: %s", e)
 
     finally:
         try:
             os.remove(file_path)
         except PermissionError:
-            print(f"⚠️ Could not delete file {file_path}, skipping cleanup.")
+            logger.warning("⚠️ Could not delete file %s, skipping cleanup.", file_path)
         except Exception as e:
-            print(f"⚠️ Cleanup error: {e}")
+            logger.warning("⚠️ Cleanup error: %s", e)
 
     return all_chunks, token_count
 
@@ -185,36 +419,24 @@ def ingest_text_block(provider_id: str, text_block: str, doc_name: str = "risk_s
     """
     Ingests a text block (risk summary or any generated narrative) into provider's FAISS index.
     """
-    from app.rag.vector_store_faiss import save_faiss_index, load_faiss_index
-    import faiss
-
-    print(f"🧠 Ingesting text block for provider {provider_id} ({'append' if append else 'overwrite'})")
+    logger.info("🧠 Ingesting text block for provider %s (%s)", provider_id, "append" if append else "overwrite")
 
     text_block = clean_text(text_block)
     chunks = chunk_text_streaming([text_block], chunk_size=800, overlap=100)
     enriched_chunks = [f"[{doc_name}] {c}" for c in chunks]
 
     if not enriched_chunks:
-        print("⚠️ No valid text chunks to embed — skipping.")
+        logger.warning("⚠️ No valid text chunks to embed — skipping.")
         return 0
 
     vectors = embed_texts(enriched_chunks)
-    faiss.normalize_L2(vectors)
 
     provider_dir = Path("app/data/faiss_store") / provider_id
     provider_dir.mkdir(parents=True, exist_ok=True)
 
-    if append:
-        try:
-            existing_vectors, existing_chunks = load_faiss_index(provider_id)  # ✅ fixed here
-            if existing_vectors is not None:
-                print(f"🔁 Merging {len(existing_vectors)} existing vectors with {len(vectors)} new ones...")
-                vectors = np.concatenate([existing_vectors, vectors], axis=0)
-                enriched_chunks = existing_chunks + enriched_chunks
-        except Exception as e:
-            print(f"⚠️ Could not load existing FAISS for {provider_id}: {e}")
-
-    save_faiss_index(vectors=vectors, chunks=enriched_chunks, doc_id=provider_id, provider_dir=str(provider_dir))
-    print(f"💾 Embedded text block for provider {provider_id} ({len(enriched_chunks)} chunks).")
+    # index.add() onto the live store: no re-embedding or copying old vectors
+    store = append_faiss_index if append else save_faiss_index
+    store(vectors=vectors, chunks=enriched_chunks, doc_id=provider_id, provider_dir=str(provider_dir))
+    logger.info("💾 Embedded text block for provider %s (%s chunks).", provider_id, len(enriched_chunks))
 
     return len(enriched_chunks)
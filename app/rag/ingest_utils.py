@@ -1,21 +1,20 @@
 # app/rag/ingest_utils.py
 
 import os
-import time
 import numpy as np
 import faiss
 from pathlib import Path
-from openai import AzureOpenAI
-from app.config import settings
+from app.rag.vector_store_faiss import normalize_rows, to_similarity
 
-# Try both PyPDF2 and PyMuPDF
+# PyMuPDF preferred, PyPDF2 as fallback
 try:
     from PyPDF2 import PdfReader
     HAS_PYPDF2 = True
 except ImportError:
     HAS_PYPDF2 = False
 try:
-    import fitz  # PyMuPDF
+    # PyMuPDF (imported by pdf_text)
+    from app.rag.pdf_text import extract_pages_parallel
     HAS_PYMUPDF = True
 except ImportError:
     HAS_PYMUPDF = False
@@ -28,20 +27,19 @@ def extract_text_from_pdf(path: str) -> str:
     print(f"⚙️ Extracting text from PDF: {path}")
     text = ""
 
-    if HAS_PYPDF2:
+    # PyMuPDF is the fast path; PyPDF2 only if it is missing or fails
+    if HAS_PYMUPDF:
         try:
-            reader = PdfReader(path)
-            text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+            text = "\n".join(extract_pages_parallel(path))
         except Exception as e:
-            print("❌ PyPDF2 failed:", e)
+            print("❌ PyMuPDF failed:", e)
 
-    # fallback if PyPDF2 empty or failed
-    if not text and HAS_PYMUPDF:
+    if not text and HAS_PYPDF2:
         try:
-            doc = fitz.open(path)
-            text = "\n".join(page.get_text("text") for page in doc)
+            reader = PdfReader(path)
+            text = "\n".join(t for t in (page.extract_text() for page in reader.pages) if t)
         except Exception as e:
-            print("❌ PyMuPDF failed:", e)
+            print("❌ PyPDF2 failed:", e)
 
     if not text:
         raise ValueError("Failed to extract any text from the PDF.")
@@ -54,13 +52,8 @@ def extract_text_from_pdf(path: str) -> str:
 def chunk_text(text: str, chunk_size: int = 400, overlap: int = 50):
     print("✂️ Splitting text into chunks...")
     words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunk = " ".join(words[start:end])
-        chunks.append(chunk)
-        start += chunk_size - overlap
+    step = chunk_size - overlap
+    chunks = [" ".join(words[start:start + chunk_size]) for start in range(0, len(words), step)]
     print(f"✅ Created {len(chunks)} chunks.")
     return chunks
 
@@ -68,37 +61,25 @@ def chunk_text(text: str, chunk_size: int = 400, overlap: int = 50):
 # ------------------------------------------
 # 🧠 Generate embeddings via Azure OpenAI
 # ------------------------------------------
-def embed_texts(chunks, batch_size=10):
-    print(f"🔌 Initializing AzureOpenAI client for {len(chunks)} chunks...")
-    client = AzureOpenAI(
-        api_key=settings.OPENAI_KEY,
-        api_version=settings.OPENAI_API_VERSION,
-        azure_endpoint=settings.OPENAI_ENDPOINT,
-        timeout=45.0,
-    )
-
-    vectors = []
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        print(f"📡 Embedding batch {i // batch_size + 1} / {len(chunks) // batch_size + 1}")
-        try:
-            response = client.embeddings.create(
-                input=batch,
-                model=settings.OPENAI_EMBEDDING_DEPLOYMENT,
-            )
-            vectors.extend([r.embedding for r in response.data])
-        except Exception as e:
-            print("❌ Batch failed:", e)
-            continue
+def embed_texts(chunks, batch_size=None):
+    """
+    Embeds chunks with concurrent batches (order preserved, failed
+    batches become zero vectors) via the main ingest embedder.
+    """
+    from app.rag.ingest import EMBED_BATCH_SIZE, embed_texts as embed_concurrently
 
-    return np.array(vectors, dtype="float32")
+    print(f"🔌 Embedding {len(chunks)} chunks with concurrent Azure OpenAI batches...")
+    return embed_concurrently(chunks, batch_size=batch_size or EMBED_BATCH_SIZE)
 
 # ------------------------------------------
 # 💾 Save FAISS index
 # ------------------------------------------
 def save_faiss_index(vectors, file_path):
     print("💾 Saving FAISS index...")
-    index = faiss.IndexFlatL2(vectors.shape[1])
+    vectors = np.array(vectors, dtype="float32", order="C")
+    normalize_rows(vectors)
+    # Inner product on unit vectors == cosine similarity
+    index = faiss.IndexFlatIP(vectors.shape[1])
     index.add(vectors)
     os.makedirs("app/vector_store", exist_ok=True)
 
@@ -121,8 +102,10 @@ def search(query_vec, top_k=4):
     index_path = os.path.join(vector_store_path, files[0])
     index = faiss.read_index(index_path)
 
-    distances, indices = index.search(query_vec, top_k)
-    return list(zip(indices[0], distances[0]))
+    query_vec = np.array(query_vec, dtype="float32", order="C").reshape(1, -1)
+    normalize_rows(query_vec)
+    scores, indices = index.search(query_vec, top_k)
+    return list(zip(indices[0], to_similarity(index, scores[0])))
 
 
 # ------------------------------------------
@@ -0,0 +1,119 @@
+# app/rag/pdf_text.py
+
+# Kept free of app.config / OpenAI imports on purpose: these functions
+# run inside worker processes, which import only this module (workers
+# come from a forkserver / spawn context, never a fork of the server).
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+
+# ============================================================
+# Extraction pool
+# ============================================================
+EXTRACT_WORKERS = os.cpu_count() or 1
+PAGES_PER_TASK = 8   # page range handed to one worker
+
+# Plain-text extraction without post-processing we undo anyway:
+# whitespace is collapsed by clean_text and ligatures are expanded
+# so embeddings see ordinary words; hyphenated line breaks are joined.
+TEXT_FLAGS = (
+    (fitz.TEXTFLAGS_TEXT | fitz.TEXT_DEHYPHENATE)
+    & ~fitz.TEXT_PRESERVE_LIGATURES
+    & ~fitz.TEXT_PRESERVE_WHITESPACE
+)
+
+_EXTRACT_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_context():
+    # Forking the multi-threaded server (executor threads, log listener,
+    # OpenMP) can copy held locks into the child; start clean instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])  # fitz imported once, in the server
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all ingests (created on first use)."""
+    global _EXTRACT_POOL
+    with _POOL_LOCK:
+        if _EXTRACT_POOL is None:
+            _EXTRACT_POOL = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=_pool_context())
+        return _EXTRACT_POOL
+
+
+def discard_extract_pool(pool: ProcessPoolExecutor):
+    """Drops a broken pool (a worker died) so the next ingest gets a fresh one."""
+    global _EXTRACT_POOL
+    with _POOL_LOCK:
+        if _EXTRACT_POOL is pool:
+            _EXTRACT_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extract_pool():
+    """Stops the worker processes; called on app shutdown."""
+    global _EXTRACT_POOL
+    with _POOL_LOCK:
+        pool, _EXTRACT_POOL = _EXTRACT_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def page_ranges(n_pages: int, size: int = PAGES_PER_TASK):
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+
+# ============================================================
+# Worker functions (must stay top-level / picklable)
+# ============================================================
+def page_count(file_path: str) -> int:
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> list[str]:
+    """Extracts pages [start, stop) with PyMuPDF; each worker opens its own document."""
+    with fitz.open(file_path) as doc:
+        return [doc[i].get_text("text", flags=TEXT_FLAGS) for i in range(start, stop)]
+
+
+def extract_pages_parallel(file_path: str):
+    """
+    Yields page texts in page order. Small files are read in-process;
+    larger ones are split into page ranges extracted on the pool
+    (PyMuPDF documents are not thread-safe, so workers are processes).
+    """
+    n_pages = page_count(file_path)
+    if n_pages <= PAGES_PER_TASK:
+        yield from extract_page_range(file_path, 0, n_pages)
+        return
+
+    pool = get_extract_pool()
+    futures = []
+    try:
+        futures = [pool.submit(extract_page_range, file_path, start, stop)
+                   for start, stop in page_ranges(n_pages)]
+        for future in futures:
+            yield from future.result()
+    except BrokenProcessPool:
+        discard_extract_pool(pool)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pages_pypdf(file_path: str, start: int = 0) -> list[str]:
+    """PyPDF2 fallback for files PyMuPDF cannot parse."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    return [page.extract_text() or "" for page in reader.pages[start:]]
@@ -0,0 +1,64 @@
+# app/rag/query_embed.py
+
+import asyncio
+import base64
+import numpy as np
+from app.config import settings
+from app.rag.cache import TTLCache
+from app.services.openai_client import get_async_openai_client
+
+# ------------------------------------------------------------
+# Query Embedding Cache
+# ------------------------------------------------------------
+# Keyed by (normalized question, embedding model); values are
+# read-only float32 vectors decoded straight from the base64 payload.
+# Callers copy before normalizing in place.
+_QUERY_EMBED_CACHE = TTLCache(maxsize=2048, ttl=3600)
+
+# Single-flight: identical questions arriving together share one
+# Azure call instead of each paying the round-trip.
+_INFLIGHT: dict[tuple, asyncio.Future] = {}
+
+
+def normalize_query(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+async def embed_query(question: str) -> np.ndarray:
+    """Embed a user question, skipping the Azure round-trip for repeats."""
+    key = (normalize_query(question), settings.OPENAI_EMBEDDING_DEPLOYMENT)
+    cached = _QUERY_EMBED_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    inflight = _INFLIGHT.get(key)
+    if inflight is not None:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                raise  # this request itself was cancelled
+            # the leading request was cancelled; embed on our own below
+
+    future = asyncio.get_running_loop().create_future()
+    _INFLIGHT[key] = future
+    try:
+        response = await get_async_openai_client().embeddings.create(
+            input=question,
+            model=settings.OPENAI_EMBEDDING_DEPLOYMENT,
+            encoding_format="base64",
+        )
+        embedding = np.frombuffer(base64.b64decode(response.data[0].embedding), dtype="<f4")
+        _QUERY_EMBED_CACHE.set(key, embedding)
+        future.set_result(embedding)
+        return embedding
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # consumed here; followers re-raise it
+        raise
+    finally:
+        if _INFLIGHT.get(key) is future:
+            del _INFLIGHT[key]
@@ -3,20 +3,71 @@
 from fastapi import APIRouter, UploadFile, File, Request
 from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from pathlib import Path
-import tempfile, os, asyncio, json
+import tempfile, os, asyncio, shutil, logging
 from datetime import datetime
 import numpy as np
-from openai import AzureOpenAI
 
 from app.rag.ingest import ingest_pdf
 from app.config import settings
+from app.services.openai_client import get_async_openai_client
+from app.rag.query_embed import embed_query
+from app.services.application_store import add_documents, find_application
 from app.rag.vector_store_faiss import query_faiss_index
 
 router = APIRouter(tags=["RAG - Ingest & Ask (Per Provider)"])
+logger = logging.getLogger(__name__)
 
 # ============================================================
 # 1️⃣ Upload & Ingest Multiple Documents (Dashboard)
 # ============================================================
+# Files of one upload are ingested concurrently; cap the number of
+# pipelines in flight to bound Azure pressure. Appends to the same
+# FAISS store are serialized inside vector_store_faiss.
+_INGEST_CONCURRENCY = asyncio.Semaphore(3)
+UPLOAD_COPY_CHUNK = 1 << 20  # 1 MB
+
+
+def _copy_upload(src, dest) -> None:
+    """Copies an upload's spooled file to disk in fixed-size chunks."""
+    src.seek(0)
+    with open(dest, "wb") as f:
+        shutil.copyfileobj(src, f, UPLOAD_COPY_CHUNK)
+
+
+async def _save_upload(file: UploadFile, dest) -> None:
+    try:
+        await asyncio.to_thread(_copy_upload, file.file, dest)
+    finally:
+        await file.close()
+
+
+async def _ingest_one(provider_id: str, file_path: Path, filename: str) -> dict:
+    """Embeds one saved upload and returns its document metadata."""
+    # Detect document type (license vs supplementary)
+    doc_type = "license" if "license" in filename.lower() else "supplementary"
+
+    # ✅ Run ingestion (append to existing FAISS)
+    async with _INGEST_CONCURRENCY:
+        try:
+            await asyncio.to_thread(
+                ingest_pdf,
+                str(file_path),
+                provider_id=provider_id,
+                doc_name=filename,
+                append=True,  # 🔁 merge embeddings into the same vector store
+            )
+            logger.info("🧠 Embedded %s into FAISS store for %s", filename, provider_id)
+        except Exception as embed_err:
+            logger.warning("⚠️ Embedding failed for %s: %s", filename, embed_err)
+
+    return {
+        "filename": filename,
+        "uploaded_at": datetime.now().isoformat(),
+        "type": doc_type,
+        "path": str(file_path),
+    }
+
+
 @router.post("/{provider_id}/ingest", summary="Upload & Ingest documents for a specific provider")
 async def upload_and_ingest_for_dashboard(
     request: Request,
@@ -36,57 +87,35 @@ async def upload_and_ingest_for_dashboard(
         provider_dir.mkdir(parents=True, exist_ok=True)
 
         # --------------------------------------------------------
-        # Load applications.json and find provider record
+        # Find provider record (documents are persisted after ingest)
         # --------------------------------------------------------
-        apps_file = Path("app/data/applications.json")
-        apps = json.loads(apps_file.read_text()) if apps_file.exists() else []
-
-        record = next(
-            (r for r in apps if r.get("id") == provider_id or r.get("application_id") == provider_id),
-            None,
-        )
-        if not record:
+        if not await asyncio.to_thread(find_application, provider_id):
             return JSONResponse(
                 status_code=404,
                 content={"error": f"Provider {provider_id} not found in applications.json"},
             )
 
-        record.setdefault("documents", [])
         new_docs = []
 
         # --------------------------------------------------------
-        # Process and embed each uploaded file
+        # Save all uploads (streamed to disk concurrently, constant memory)
         # --------------------------------------------------------
-        for file in files:
-            file_path = provider_dir / file.filename
-            with open(file_path, "wb") as f:
-                f.write(await file.read())
-            print(f"📥 Saved {file.filename} → {file_path}")
-
-            # Detect document type (license vs supplementary)
-            doc_type = "license" if "license" in file.filename.lower() else "supplementary"
-
-            # ✅ Run ingestion (append to existing FAISS)
-            try:
-                await asyncio.to_thread(
-                    ingest_pdf,
-                    str(file_path),
-                    provider_id=provider_id,
-                    doc_name=file.filename,
-                    append=True,  # 🔁 merge embeddings into the same vector store
-                )
-                print(f"🧠 Embedded {file.filename} into FAISS store for {provider_id}")
-            except Exception as embed_err:
-                print(f"⚠️ Embedding failed for {file.filename}: {embed_err}")
-
-            # ✅ Record metadata
-            meta = {
-                "filename": file.filename,
-                "uploaded_at": datetime.now().isoformat(),
-                "type": doc_type,
-                "path": str(file_path),
-            }
-            record["documents"].append(meta)
+        file_paths = [provider_dir / file.filename for file in files]
+        await asyncio.gather(*(
+            _save_upload(file, file_path) for file, file_path in zip(files, file_paths)
+        ))
+        for file, file_path in zip(files, file_paths):
+            logger.debug("📥 Saved %s → %s", file.filename, file_path)
+
+        # --------------------------------------------------------
+        # Embed files in parallel (bounded), then record metadata
+        # --------------------------------------------------------
+        metas = await asyncio.gather(*(
+            _ingest_one(provider_id, file_path, file.filename)
+            for file, file_path in zip(files, file_paths)
+        ))
+
+        for file, meta in zip(files, metas):
             # Risk relevance heuristic and re-evaluation trigger
             from app.risk.orchestrator import evaluate_provider
 
@@ -94,19 +123,19 @@ async def upload_and_ingest_for_dashboard(
             doc_marked_risk_relevant = any(k in file.filename.lower() for k in risk_keywords)
 
             if doc_marked_risk_relevant:
-                print(f"⚠️ Risk-relevant document detected: {file.filename}")
+                logger.info("⚠️ Risk-relevant document detected: %s", file.filename)
                 loop = asyncio.get_event_loop()
                 loop.create_task(evaluate_provider(provider_id))
             else:
-                print(f"ℹ️ Non-risk document uploaded: {file.filename}")
+                logger.debug("ℹ️ Non-risk document uploaded: %s", file.filename)
 
             new_docs.append(meta)
 
         # --------------------------------------------------------
-        # Save back to applications.json
+        # Save back to applications.json (one atomic, locked write)
         # --------------------------------------------------------
-        apps_file.write_text(json.dumps(apps, indent=2))
-        print(f"✅ {len(new_docs)} document(s) ingested for provider {provider_id}")
+        documents = await asyncio.to_thread(add_documents, provider_id, new_docs) or new_docs
+        logger.info("✅ %s document(s) ingested for provider %s", len(new_docs), provider_id)
 
         # --------------------------------------------------------
         # Return JSON response (for frontend updates)
@@ -115,12 +144,12 @@ async def upload_and_ingest_for_dashboard(
             {
                 "status": "success",
                 "message": f"{len(new_docs)} document(s) uploaded and embedded successfully.",
-                "documents": record["documents"],
+                "documents": documents,
             }
         )
 
     except Exception as e:
-        print(f"❌ Error during ingestion for {provider_id}: {e}")
+        logger.error("❌ Error during ingestion for %s: %s", provider_id, e)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
@@ -138,8 +167,8 @@ async def ingest_for_provider(file: UploadFile = File(...), provider_id: str = N
     provider_dir.mkdir(parents=True, exist_ok=True)
 
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(await file.read())
         tmp_path = tmp.name
+    await _save_upload(file, tmp_path)
 
     try:
         await asyncio.to_thread(
@@ -157,6 +186,26 @@ async def ingest_for_provider(file: UploadFile = File(...), provider_id: str = N
 # ============================================================
 # 3️⃣ Ask Endpoint (Streaming Response + Metadata Awareness)
 # ============================================================
+def _documents_meta_text(provider_id: str) -> str:
+    """Lists the provider's uploaded files for the prompt (TEMP-ID fallback)."""
+    rec = find_application(provider_id)
+    if not rec and provider_id.startswith("APP-"):
+        rec = find_application(provider_id.replace("APP-", "TEMP-ID-"))
+    if rec and rec.get("documents"):
+        filenames = []
+        for d in rec["documents"]:
+            if isinstance(d, dict):
+                filenames.append(d.get("filename"))
+            elif isinstance(d, str):
+                filenames.append(d)
+        if filenames:
+            return "\n\n📂 Provider uploaded documents:\n" + "\n".join(f"- {f}" for f in filenames)
+        return "\n\nℹ️ No additional uploaded documents found."
+    elif rec:
+        return "\n\nℹ️ No additional uploaded documents found."
+    return ""
+
+
 @router.post("/ask")
 async def ask_provider_docs(req: dict):
     """
@@ -166,24 +215,20 @@ async def ask_provider_docs(req: dict):
     question = req.get("query", "")
     provider_id = req.get("provider_id", "")
     top_k = req.get("top_k", 3)
+    preset = req.get("search_mode")  # optional "fast" / "accurate"
 
     if not question or not provider_id:
         return JSONResponse(status_code=400, content={"error": "Missing query or provider_id."})
 
     # --------------------------------------------------------
-    # Step 1️⃣ Initialize Azure client + embed query
+    # Step 1️⃣ Embed query (cached + single-flight per question) while
+    #         the uploaded-file metadata is read on a worker thread
     # --------------------------------------------------------
-    client = AzureOpenAI(
-        api_key=settings.OPENAI_KEY,
-        api_version=settings.OPENAI_API_VERSION,
-        azure_endpoint=settings.OPENAI_ENDPOINT,
+    query_vec, meta_text = await asyncio.gather(
+        embed_query(question),
+        asyncio.to_thread(_documents_meta_text, provider_id),
     )
 
-    query_vec = client.embeddings.create(
-        input=question,
-        model=settings.OPENAI_EMBEDDING_DEPLOYMENT,
-    ).data[0].embedding
-
     # --------------------------------------------------------
     # Step 2️⃣ Resolve FAISS directory (with TEMP-ID fallback)
     # --------------------------------------------------------
@@ -195,7 +240,7 @@ async def ask_provider_docs(req: dict):
             alt_dir = Path("app/data/faiss_store") / temp_id
             if alt_dir.exists():
                 provider_dir = alt_dir
-                print(f"🔄 Using fallback TEMP-ID FAISS store for {provider_id}")
+                logger.debug("🔄 Using fallback TEMP-ID FAISS store for %s", provider_id)
         if not provider_dir.exists():
             return JSONResponse(
                 status_code=404,
@@ -207,46 +252,26 @@ async def ask_provider_docs(req: dict):
     # --------------------------------------------------------
     results = await asyncio.to_thread(
         query_faiss_index,
-        np.array([query_vec], dtype="float32"),
+        np.array(query_vec, dtype=np.float32).reshape(1, -1),  # copy: normalized in place
         str(provider_dir),
         top_k,
+        preset,
     )
 
-    context_text = "\n".join([r["text"] for r in results]) if results else "No relevant FAISS matches found."
-
-    # --------------------------------------------------------
-    # Step 4️⃣ Append uploaded file metadata
-    # --------------------------------------------------------
-    apps_file = Path("app/data/applications.json")
-    meta_text = ""
-    if apps_file.exists():
-        apps = json.loads(apps_file.read_text())
-        rec = next((r for r in apps if r["id"] == provider_id), None)
-        if not rec and provider_id.startswith("APP-"):
-            rec = next((r for r in apps if r["id"] == provider_id.replace("APP-", "TEMP-ID-")), None)
-        if rec and rec.get("documents"):
-            filenames = []
-            for d in rec["documents"]:
-                if isinstance(d, dict):
-                    filenames.append(d.get("filename"))
-                elif isinstance(d, str):
-                    filenames.append(d)
-            if filenames:
-                meta_text = "\n\n📂 Provider uploaded documents:\n" + "\n".join(f"- {f}" for f in filenames)
-            else:
-                meta_text = "\n\nℹ️ No additional uploaded documents found."
-        elif rec:
-            meta_text = "\n\nℹ️ No additional uploaded documents found."
+    context_chunks = [r["text"] for r in results] if results else ["No relevant FAISS matches found."]
 
-
-    full_context = f"{context_text}\n{meta_text}"
+    # Prompt assembled in one join (context chunks are copied once)
+    user_prompt = "\n".join(["Context:", *context_chunks, f"{meta_text}\n\nQuestion: {question}"])
 
     # --------------------------------------------------------
-    # Step 5️⃣ Stream AI completion from Azure OpenAI
+    # Step 4️⃣ Stream AI completion from Azure OpenAI
     # --------------------------------------------------------
-    def generate():
+    # Plain-text stream ending in "[END]" (what the dashboard chat reads).
+    # Async iteration keeps the stream on the event loop instead of
+    # pinning a threadpool worker per open answer.
+    async def generate():
         try:
-            stream = client.chat.completions.create(
+            stream = await get_async_openai_client().chat.completions.create(
                 model=settings.OPENAI_CHAT_DEPLOYMENT,
                 messages=[
                     {
@@ -258,23 +283,24 @@ async def ask_provider_docs(req: dict):
                     },
                     {
                         "role": "user",
-                        "content": f"Context:\n{full_context}\n\nQuestion: {question}",
+                        "content": user_prompt,
                     },
                 ],
                 stream=True,
                 temperature=0.2,
             )
 
-            for chunk in stream:
-                if not hasattr(chunk, "choices") or not chunk.choices:
-                    continue
-                choice = chunk.choices[0]
-                if hasattr(choice, "delta") and getattr(choice.delta, "content", None):
-                    yield choice.delta.content
+            async for chunk in stream:
+                try:
+                    content = chunk.choices[0].delta.content
+                except (AttributeError, IndexError, TypeError):
+                    continue  # e.g. the content-filter preamble has no choices
+                if content:
+                    yield content
 
             yield "[END]"
         except Exception as e:
-            print(f"❌ Error during streaming: {e}")
+            logger.error("❌ Error during streaming: %s", e)
             yield f"\n\n❌ Error during streaming: {e}"
 
     return StreamingResponse(generate(), media_type="text/plain")
@@ -283,6 +309,28 @@ async def ask_provider_docs(req: dict):
 # ============================================================
 # 4️⃣ Utility – List All Providers
 # ============================================================
+# provider dir path → (dir mtime_ns, .index count)
+_INDEX_COUNTS: dict[str, tuple[int, int]] = {}
+
+
+def _scan_providers(base_dir: Path) -> list[dict]:
+    providers = []
+    with os.scandir(base_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):  # d_type from the dirent, no extra stat
+                continue
+            mtime = entry.stat().st_mtime_ns
+            cached = _INDEX_COUNTS.get(entry.path)
+            if cached and cached[0] == mtime:
+                count = cached[1]
+            else:
+                with os.scandir(entry.path) as files:
+                    count = sum(1 for f in files if f.name.endswith(".index"))
+                _INDEX_COUNTS[entry.path] = (mtime, count)
+            providers.append({"provider_id": entry.name, "documents": count})
+    return providers
+
+
 @router.get("/providers")
 async def list_providers():
     """Lists all providers in FAISS with their document counts."""
@@ -290,12 +338,4 @@ async def list_providers():
     if not base_dir.exists():
         return []
 
-    providers = []
-    for pid in os.listdir(base_dir):
-        pdir = base_dir / pid
-        if not pdir.is_dir():
-            continue
-        docs = [f for f in os.listdir(pdir) if f.endswith(".index")]
-        providers.append({"provider_id": pid, "documents": len(docs)})
-
-    return providers
+    return await asyncio.to_thread(_scan_providers, base_dir)
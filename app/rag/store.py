@@ -13,8 +13,10 @@ def _new_index(dim: int) -> faiss.IndexFlatIP:
     return index
 
 def _normalize(v: np.ndarray) -> np.ndarray:
-    n = np.linalg.norm(v, axis=1, keepdims=True) + 1e-12
-    return v / n
+    # one contiguous float32 copy, normalized in place by FAISS's SIMD kernel
+    v = np.array(v, dtype="float32", order="C")
+    faiss.normalize_L2(v)
+    return v
 
 def load_store(dim: int) -> Tuple[faiss.IndexFlatIP, list]:
     if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
@@ -30,7 +32,7 @@ def load_store(dim: int) -> Tuple[faiss.IndexFlatIP, list]:
 def add_vectors(embeddings: np.ndarray, meta_rows: List[tuple], dim: int):
     index, meta = load_store(dim)
     # ensure shapes + normalize
-    vectors = _normalize(embeddings.astype("float32"))
+    vectors = _normalize(embeddings)
     if index.ntotal == 0 and index.d != vectors.shape[1]:
         # index was fresh; FAISS FlatIP has fixed d; rebuild to be safe
         index = _new_index(vectors.shape[1])
@@ -45,8 +47,7 @@ def search(query_vec: np.ndarray, top_k: int) -> List[tuple]:
     index, meta = load_store(query_vec.shape[1])
     if index.ntotal == 0:
         return []
-    q = query_vec.astype("float32")
-    q = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-12)
+    q = _normalize(query_vec)
     D, I = index.search(q, top_k)  # cosine similarity via IP on normalized
     hits = []
     for idx in I[0]:
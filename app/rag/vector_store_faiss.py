@@ -1,15 +1,284 @@
 import os
+import logging
 import faiss
 import numpy as np
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from pathlib import Path
 import json
+from app.rag.cache import invalidate_provider_answers
+from app.rag.chunk_store import (
+    append_chunks,
+    chunks_exist,
+    chunks_signature,
+    file_signature,
+    read_chunks,
+    truncate_chunks,
+    write_chunks,
+)
+
+logger = logging.getLogger(__name__)
 
 # --------------------------------------------------------------------
 # Base FAISS storage root
 # --------------------------------------------------------------------
-BASE_INDEX_DIR = Path("app/data/faiss_store")
-BASE_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+BASE_INDEX_DIR = Path("app/data/faiss_store")  # created by the first save (provider_dir.mkdir)
+
+# --------------------------------------------------------------------
+# OpenMP threads per FAISS call
+# --------------------------------------------------------------------
+# Concurrency comes from the app (parallel /ask requests, per-store
+# searches on worker threads). Letting each search also spawn an
+# all-core OpenMP team oversubscribes the CPU, so keep teams small.
+FAISS_OMP_THREADS = max(1, int(os.getenv("FAISS_OMP_THREADS", "1")))
+faiss.omp_set_num_threads(FAISS_OMP_THREADS)
+
+# Cached indices are search-only: map the file read-only so uvicorn
+# workers share page-cache pages for the vector codes. The flag depends
+# on the index type (combining them breaks IVF reads):
+#   IVF tiers      IO_FLAG_MMAP      → inverted lists on OnDiskInvertedLists
+#   flat / HNSW    IO_FLAG_MMAP_IFC  → code arrays mapped (faiss >= 1.8;
+#                  older builds read these two tiers into each worker's heap)
+_READ_ONLY = getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+IVF_READ_FLAGS = faiss.IO_FLAG_MMAP | _READ_ONLY
+CODES_READ_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | _READ_ONLY
+IVF_FOURCC_PREFIXES = (b"Iw", b"Iv")   # IwSq, IwPQ, IwFl, legacy IvPQ, ...
+
+# --------------------------------------------------------------------
+# Optional GPU search for very large stores (faiss-gpu builds only)
+# --------------------------------------------------------------------
+GPU_MIN_VECTORS = 1_000_000
+HAS_FAISS_GPU = hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+_GPU_RESOURCES = None   # one CUDA context / scratch pool per process
+# GPU indices (and the StandardGpuResources they share) are not safe for
+# concurrent search() calls from the search pool: serialize them.
+_GPU_SEARCH_LOCK = threading.Lock()
+
+# --------------------------------------------------------------------
+# Index type by corpus size (flat-fp16 → IVF-SQ8 → HNSW-SQ8 → IVF-PQ)
+# --------------------------------------------------------------------
+EXACT_MAX_VECTORS = 1_000      # too few vectors to train a quantizer
+IVF_MAX_VECTORS = 10_000
+IVF_MIN_NLIST = 4
+IVF_MIN_POINTS_PER_CENTROID = 39   # FAISS k-means warns (and trains poorly) below this
+USE_SQ = True                  # scalar-quantized codes; False keeps float32 vectors
+SQ_TYPES = {"8bit": faiss.ScalarQuantizer.QT_8bit, "fp16": faiss.ScalarQuantizer.QT_fp16}
+SQ_TYPE = SQ_TYPES.get(os.getenv("FAISS_SQ_TYPE", "8bit"), faiss.ScalarQuantizer.QT_8bit)
+EXACT_SQ_TYPE = faiss.ScalarQuantizer.QT_fp16  # exhaustive tier: no trained ranges
+SQ_RANGE_MARGIN = 0.1          # 8-bit: headroom for vectors appended after training
+HNSW_MAX_VECTORS = 500_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64            # speed/recall knob; top_k is small (≤ 10)
+IVF_PQ_NBITS = 8
+IVF_RETRAIN_GROWTH = 2         # retrain IVF centroids once a store doubles
+SEARCH_PARAM_NAMES = ("nprobe", "efSearch")  # params.json keys applied at load
+
+# Per-request speed/recall presets (override the persisted params)
+SEARCH_PRESETS = {
+    "fast": {"nprobe": 8, "efSearch": 32},
+    "accurate": {"nprobe": 32, "efSearch": 128},
+}
+
+
+# --------------------------------------------------------------------
+# 🏗️ Build an index sized for the corpus
+# --------------------------------------------------------------------
+def tier_for(n: int) -> str:
+    """Index tier build_index() picks for n vectors."""
+    if n < EXACT_MAX_VECTORS:
+        return "exact"
+    if n < IVF_MAX_VECTORS:
+        return "ivf"
+    if n < HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivfpq"
+
+
+def build_index(vectors: np.ndarray):
+    """
+    Builds an inner-product index over (already normalized) vectors.
+    Tiny stores are scanned exhaustively (fp16 codes); larger ones
+    switch to sub-linear search (inverted lists, then HNSW, then
+    IVF-PQ) over int8 / PQ codes.
+
+    Returns:
+        tuple[faiss.Index, dict]: index + search-time parameters
+        (efSearch / nprobe) and the build size, persisted alongside it.
+    """
+    n, dim = vectors.shape
+    tier = tier_for(n)
+
+    if tier == "exact":
+        if USE_SQ:
+            # fp16 halves bytes scanned; needs no training, so appends stay exact
+            index = faiss.IndexScalarQuantizer(dim, EXACT_SQ_TYPE, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        params = {}
+    elif tier == "ivf":
+        # Inverted lists: each query scans ~nprobe/nlist of the corpus
+        nlist = max(IVF_MIN_NLIST, min(int(4 * np.sqrt(n)), n // IVF_MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatIP(dim)
+        if USE_SQ:
+            # int8 codes: 4x fewer bytes per vector on disk, in RAM and per scan
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, nlist, SQ_TYPE, faiss.METRIC_INNER_PRODUCT
+            )
+            index.sq.rangestat_arg = SQ_RANGE_MARGIN
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        params = {"nprobe": max(1, nlist // 16)}
+    elif tier == "hnsw":
+        if USE_SQ:
+            # Graph over int8 codes instead of float32 copies of every vector
+            index = faiss.IndexHNSWSQ(dim, SQ_TYPE, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            faiss.downcast_index(index.storage).sq.rangestat_arg = SQ_RANGE_MARGIN
+            index.train(vectors)
+        else:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        params = {"efSearch": HNSW_EF_SEARCH}
+    else:
+        nlist = int(4 * np.sqrt(n))
+        m = next(m for m in (64, 48, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, IVF_PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        params = {"nprobe": max(1, nlist // 16)}
+
+    index.add(vectors)
+    params["built_for"] = n  # appends re-tier / retrain relative to this
+    return index, params
+
+
+def needs_rebuild(built_for: int, new_total: int) -> bool:
+    """True once appends cross a tier boundary or outgrow IVF training."""
+    tier = tier_for(built_for)
+    if tier_for(new_total) != tier:
+        return True
+    return tier in ("ivf", "ivfpq") and new_total >= IVF_RETRAIN_GROWTH * built_for
+
+
+def reconstruct_all(index) -> np.ndarray:
+    """Decodes every stored vector (exact for fp16/flat, approximate for int8/PQ codes)."""
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass  # not an IVF index: reconstruct directly
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _params_path(index_path) -> Path:
+    index_path = Path(index_path)
+    return index_path.with_name(index_path.stem + ".params.json")
+
+
+def write_index_atomic(index, index_path):
+    """
+    Writes to a temp file and swaps it in: cached readers keep their
+    mmap of the old inode instead of seeing a truncated file.
+    """
+    index_path = Path(index_path)
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, index_path)
+
+
+def to_gpu_if_large(index):
+    """
+    Copies stores with ≥ GPU_MIN_VECTORS vectors to GPU 0 when a GPU
+    build of FAISS is available. Search params must already be applied.
+    HNSW has no GPU version; those (and any failure) stay on CPU.
+    """
+    global _GPU_RESOURCES
+    if not HAS_FAISS_GPU or index.ntotal < GPU_MIN_VECTORS:
+        return index
+    try:
+        if _GPU_RESOURCES is None:
+            _GPU_RESOURCES = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(_GPU_RESOURCES, 0, index)
+    except Exception as e:
+        logger.warning("⚠️ GPU copy failed, searching on CPU: %s", e)
+        return index
+
+
+def apply_search_params(index, params: dict):
+    """Applies persisted efSearch / nprobe values to a loaded index."""
+    params = {k: v for k, v in (params or {}).items() if k in SEARCH_PARAM_NAMES}
+    if not params:
+        return
+    ps = faiss.ParameterSpace()
+    for name, value in params.items():
+        ps.set_index_parameter(index, name, value)
+
+
+def search_params_for(index, preset: str | None, top_k: int):
+    """
+    SearchParameters for a preset, or None to use the index's own
+    settings. Passed per call, so the shared cached index is never mutated.
+    """
+    values = SEARCH_PRESETS.get(preset or "")
+    if not values or _is_gpu_index(index):
+        return None
+    if hasattr(index, "nprobe"):
+        return faiss.SearchParametersIVF(nprobe=min(values["nprobe"], index.nlist))
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=max(values["efSearch"], top_k))
+    return None  # flat / GPU indices: nothing to tune
+
+
+def _is_gpu_index(index) -> bool:
+    return type(index).__name__.startswith("Gpu")
+
+
+def search(index, query_vec: np.ndarray, top_k: int, preset: str | None = None):
+    if _is_gpu_index(index):
+        with _GPU_SEARCH_LOCK:
+            return index.search(query_vec, top_k)  # presets are CPU-only
+    params = search_params_for(index, preset, top_k)
+    if params is None:
+        return index.search(query_vec, top_k)
+    return index.search(query_vec, top_k, params=params)
+
+
+# --------------------------------------------------------------------
+# 🔒 One writer per store (parallel uploads to the same provider)
+# --------------------------------------------------------------------
+_STORE_LOCKS: dict[str, threading.Lock] = {}
+_STORE_LOCKS_GUARD = threading.Lock()
+
+
+def store_lock(provider_dir, doc_id: str) -> threading.Lock:
+    """Serializes read-modify-write of a store's index + chunk files."""
+    key = str(Path(provider_dir) / doc_id)
+    with _STORE_LOCKS_GUARD:
+        return _STORE_LOCKS.setdefault(key, threading.Lock())
+
+
+# --------------------------------------------------------------------
+# 📏 L2 normalization (skipped when the embedder already did it)
+# --------------------------------------------------------------------
+UNIT_NORM_SAMPLE = 32
+UNIT_NORM_ATOL = 1e-4
+
+
+def _is_unit_norm(v: np.ndarray, sample: int = UNIT_NORM_SAMPLE) -> bool:
+    """Checks an evenly spaced sample of rows for unit L2 norm."""
+    if v.shape[0] == 0:
+        return True
+    rows = v[:: max(1, v.shape[0] // sample)]
+    norms = np.einsum("ij,ij->i", rows, rows)
+    return bool(np.allclose(norms, 1.0, atol=UNIT_NORM_ATOL))
+
+
+def normalize_rows(v: np.ndarray) -> None:
+    """In-place faiss.normalize_L2, unless rows are already unit length."""
+    if not _is_unit_norm(v):
+        faiss.normalize_L2(v)
 
 
 # --------------------------------------------------------------------
@@ -20,59 +289,298 @@ def save_faiss_index(vectors: np.ndarray, chunks: list[str], doc_id: str, provid
     Saves FAISS index and text chunks under the provider folder.
     Uses direct write for atomic updates.
     """
+    with store_lock(provider_dir, doc_id):
+        _save_faiss_index(vectors, chunks, doc_id, provider_dir)
+
+
+def _save_faiss_index(vectors, chunks, doc_id, provider_dir):
     provider_dir = Path(provider_dir)
     provider_dir.mkdir(parents=True, exist_ok=True)
 
     if vectors.ndim != 2:
         raise ValueError(f"Expected 2D embeddings array, got {vectors.shape}")
 
-    dim = vectors.shape[1]
-    faiss.normalize_L2(vectors)
-    index = faiss.IndexFlatL2(dim)
-    index.add(vectors)
+    # OpenAI embeddings are already unit length; only renormalize if not
+    normalize_rows(vectors)
+    # Inner product on unit vectors == cosine similarity
+    index, params = build_index(vectors)
 
     index_path = provider_dir / f"{doc_id}.index"
-    chunk_path = provider_dir / f"{doc_id}_chunks.npy"
+    chunk_path = provider_dir / f"{doc_id}_chunks.bin"
 
     try:
-        faiss.write_index(index, str(index_path))
-        np.save(str(chunk_path), np.array(chunks, dtype=object))
-        print(f"💾 Saved FAISS index → {index_path} ({len(chunks)} chunks)")
+        write_index_atomic(index, index_path)
+        _params_path(index_path).write_text(json.dumps(params))
+        write_chunks(chunks, chunk_path)
+        evict_index(index_path)
+        register_index(doc_id, index_path)
+        invalidate_provider_answers(provider_dir.name)
+        logger.info("💾 Saved FAISS index → %s (%s chunks)", index_path, len(chunks))
     except Exception as e:
-        print(f"❌ Error saving FAISS index for {doc_id}: {e}")
+        logger.error("❌ Error saving FAISS index for %s: %s", doc_id, e)
 
 
 # --------------------------------------------------------------------
-# 📂 Load FAISS index (sync, recursive search)
+# ➕ Append to an existing FAISS store (rebuilt only at tier changes)
 # --------------------------------------------------------------------
-def load_faiss_index(doc_id: str):
+def append_faiss_index(vectors: np.ndarray, chunks: list[str], doc_id: str, provider_dir: str):
     """
-    Loads FAISS index and chunks for a given provider or doc ID.
-    Searches recursively if not found in the top level.
+    Adds new vectors + chunks to an existing store with index.add(),
+    so each ingest costs O(new) instead of re-indexing everything.
+    Once the store crosses a tier boundary (or an IVF store doubles),
+    it is rebuilt from its decoded vectors so the tier / centroids fit.
+    Creates the store via save_faiss_index() if it does not exist yet.
+    Concurrent appends to the same store are serialized.
     """
-    import glob
+    with store_lock(provider_dir, doc_id):
+        _append_faiss_index(vectors, chunks, doc_id, provider_dir)
 
-    # Default paths
-    index_path = BASE_INDEX_DIR / f"{doc_id}.index"
-    chunk_path = BASE_INDEX_DIR / f"{doc_id}_chunks.npy"
 
-    # 🔍 If not found, search recursively (handles risk subfolders)
-    if not index_path.exists() or not chunk_path.exists():
-        matches = glob.glob(str(BASE_INDEX_DIR / "**" / f"{doc_id}.index"), recursive=True)
-        if matches:
-            index_path = Path(matches[0])
-            chunk_path = index_path.with_name(index_path.stem + "_chunks.npy")
-            print(f"✅ Found FAISS index for {doc_id} → {index_path}")
-        else:
-            print(f"⚠️ No FAISS index found for {doc_id}")
-            return None, None
+def _append_faiss_index(vectors, chunks, doc_id, provider_dir):
+    provider_dir = Path(provider_dir)
+    index_path = provider_dir / f"{doc_id}.index"
+    chunk_path = provider_dir / f"{doc_id}_chunks.bin"
+
+    if not index_path.exists() or not chunks_exist(chunk_path):
+        return _save_faiss_index(vectors, chunks, doc_id, str(provider_dir))
+
+    if vectors.ndim != 2:
+        raise ValueError(f"Expected 2D embeddings array, got {vectors.shape}")
+
+    # Private, fully-read copy (not the cached mmap) so add() can grow it.
+    index = faiss.read_index(str(index_path))
+    existing_chunks = read_chunks(chunk_path)
+
+    # Never rebuild from the new batch alone: that would drop every
+    # existing vector. The store has to be re-ingested (append=False).
+    if index.d != vectors.shape[1] or index.ntotal != len(existing_chunks):
+        raise RuntimeError(
+            f"FAISS store for {doc_id} is inconsistent (d={index.d} vs {vectors.shape[1]}, "
+            f"vectors={index.ntotal}, chunks={len(existing_chunks)}); re-ingest it to rebuild."
+        )
+    n_existing = len(existing_chunks)
+
+    normalize_rows(vectors)
+    params_path = _params_path(index_path)
+    params = json.loads(params_path.read_text()) if params_path.exists() else {}
+    built_for = params.setdefault("built_for", index.ntotal)  # legacy stores: current size
+    if needs_rebuild(built_for, index.ntotal + len(vectors)):
+        # Re-tier (e.g. fp16 flat → IVF) or retrain stale centroids over
+        # the decoded existing vectors plus the new batch.
+        logger.info("🏗️ Rebuilding FAISS store for %s: %s → %s vectors", doc_id, built_for,
+                    index.ntotal + len(vectors))
+        index, params = build_index(np.vstack([reconstruct_all(index), vectors]))
+    else:
+        index.add(vectors)
+
+    try:
+        # Chunks first, index last: the index write is the commit point,
+        # and searches only return ids < ntotal, so an interrupted append
+        # leaves the old store fully searchable.
+        append_chunks(chunks, chunk_path)
+        try:
+            write_index_atomic(index, index_path)
+        except Exception:
+            truncate_chunks(chunk_path, n_existing)
+            raise
+        params_path.write_text(json.dumps(params))
+        evict_index(index_path)
+        invalidate_provider_answers(provider_dir.name)
+        logger.info("💾 Appended %s chunk(s) → %s (%s total)", len(chunks), index_path, index.ntotal)
+    except Exception as e:
+        logger.error("❌ Error appending to FAISS index for %s: %s", doc_id, e)
+
+
+# --------------------------------------------------------------------
+# 📐 Distance → similarity
+# --------------------------------------------------------------------
+def to_similarity(index, distances: np.ndarray) -> np.ndarray:
+    """
+    Inner-product indices already return cosine similarity.
+    Legacy IndexFlatL2 stores (unit vectors) are converted via 1 - d/2.
+    """
+    if index.metric_type == faiss.METRIC_L2:
+        return 1 - distances / 2
+    return distances
+
+
+# --------------------------------------------------------------------
+# 🗃️ In-process cache of loaded indices (index_path → index, chunks, signature)
+# --------------------------------------------------------------------
+# LRU-bounded: only the working set of stores stays loaded; the least
+# recently searched one is dropped (its mmap released) on overflow.
+INDEX_CACHE_MAX = int(os.getenv("FAISS_INDEX_CACHE_MAX", "32"))
+_INDEX_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+# One loader per index path: concurrent first queries wait for it
+# instead of each reading the same files.
+_LOAD_LOCKS: dict[str, threading.Lock] = {}
+
+
+def evict_index(index_path):
+    """Drops a cached index after its files were rewritten."""
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE.pop(str(index_path), None)
+
+
+def read_flags_for(index_path) -> int:
+    """Picks the mmap flags from the index file's fourcc header."""
+    with open(index_path, "rb") as f:
+        fourcc = f.read(4)
+    return IVF_READ_FLAGS if fourcc[:2] in IVF_FOURCC_PREFIXES else CODES_READ_FLAGS
+
+
+def read_index_mapped(index_path):
+    """Memory-mapped read; falls back to a plain read if mapping is refused."""
+    index_path = str(index_path)
+    try:
+        return faiss.read_index(index_path, read_flags_for(index_path))
+    except RuntimeError as e:
+        logger.warning("⚠️ mmap read failed for %s (%s); reading into memory.", index_path, e)
+        return faiss.read_index(index_path)
+
+
+def load_index_files(index_path, chunk_path):
+    """
+    Loads a FAISS index and its chunk table from explicit paths.
+    The index is memory-mapped where the faiss build supports it (pages
+    fault in on first search) and the in-process copy is reused while
+    both are unchanged on disk.
+    """
+    index_path, chunk_path = str(index_path), str(chunk_path)
+    mtime = (file_signature(index_path), chunks_signature(chunk_path))
+
+    with _INDEX_CACHE_LOCK:
+        cached = _INDEX_CACHE.get(index_path)
+        if cached:
+            _INDEX_CACHE.move_to_end(index_path)
+        load_lock = _LOAD_LOCKS.setdefault(index_path, threading.Lock())
+    if cached and cached[2] == mtime:
+        return cached[0], cached[1]
+
+    with load_lock:
+        with _INDEX_CACHE_LOCK:
+            cached = _INDEX_CACHE.get(index_path)
+        if cached and cached[2] == mtime:
+            return cached[0], cached[1]  # loaded by a concurrent request
+
+        index = read_index_mapped(index_path)
+        params_path = _params_path(index_path)
+        if params_path.exists():
+            apply_search_params(index, json.loads(params_path.read_text()))
+        index = to_gpu_if_large(index)
+        chunks = read_chunks(chunk_path)
+        with _INDEX_CACHE_LOCK:
+            _INDEX_CACHE[index_path] = (index, chunks, mtime)
+            _INDEX_CACHE.move_to_end(index_path)
+            while len(_INDEX_CACHE) > INDEX_CACHE_MAX:
+                evicted, _ = _INDEX_CACHE.popitem(last=False)
+                logger.debug("🧹 Evicted FAISS store from cache: %s", evicted)
+    return index, chunks
+
+
+# --------------------------------------------------------------------
+# 🗂️ doc_id → index path registry (one scandir walk, refreshed lazily)
+# --------------------------------------------------------------------
+INDEX_REGISTRY: dict[str, Path] = {}
+_REGISTRY_LOCK = threading.Lock()
+_registry_mtime = None
+
+
+def _scan_index_dir(root: Path) -> dict[str, Path]:
+    """Walks the store once with os.scandir; top-level indices win over nested ones."""
+    found, nested = {}, []
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.name.endswith(".index"):
+                        doc_id = entry.name[: -len(".index")]
+                        if current == root:
+                            found[doc_id] = Path(entry.path)
+                        else:
+                            nested.append((doc_id, Path(entry.path)))
+        except FileNotFoundError:
+            continue
+    for doc_id, path in nested:
+        found.setdefault(doc_id, path)
+    return found
+
+
+def refresh_index_registry(force: bool = False) -> dict[str, Path]:
+    """
+    Rebuilds INDEX_REGISTRY when the store root changed since the last
+    scan (or when forced, e.g. after a lookup miss).
+    """
+    global _registry_mtime
+    try:
+        mtime = BASE_INDEX_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+
+    with _REGISTRY_LOCK:
+        if force or mtime != _registry_mtime:
+            INDEX_REGISTRY.clear()
+            INDEX_REGISTRY.update(_scan_index_dir(BASE_INDEX_DIR))
+            _registry_mtime = mtime
+        return INDEX_REGISTRY
+
+
+def register_index(doc_id: str, index_path: Path):
+    """Records a freshly saved store so lookups don't need a rescan."""
+    index_path = Path(index_path)
+    with _REGISTRY_LOCK:
+        current = INDEX_REGISTRY.get(doc_id)
+        if current is None or current.parent != BASE_INDEX_DIR:
+            INDEX_REGISTRY[doc_id] = index_path
+
+
+def resolve_index_path(doc_id: str):
+    """Returns the .index path for doc_id, rescanning once on a miss."""
+    path = refresh_index_registry().get(doc_id)
+    if path is None:
+        path = refresh_index_registry(force=True).get(doc_id)
+    return path
+
+
+def list_index_ids(top_level_only: bool = False) -> list[str]:
+    """Lists registered doc_ids, optionally only those stored at the store root."""
+    registry = refresh_index_registry()
+    with _REGISTRY_LOCK:
+        items = list(registry.items())
+    if top_level_only:
+        return [doc_id for doc_id, path in items if path.parent == BASE_INDEX_DIR]
+    return [doc_id for doc_id, _ in items]
+
+
+# --------------------------------------------------------------------
+# 📂 Load FAISS index (sync, registry lookup)
+# --------------------------------------------------------------------
+def load_faiss_index(doc_id: str):
+    """
+    Loads FAISS index and chunks for a given provider or doc ID.
+    Top-level stores take precedence; nested (risk) stores are found
+    through the registry without a recursive glob per request.
+    """
+    index_path = resolve_index_path(doc_id)
+    if index_path is None:
+        logger.warning("⚠️ No FAISS index found for %s", doc_id)
+        return None, None
+    chunk_path = index_path.with_name(index_path.stem + "_chunks.bin")
 
     try:
-        index = faiss.read_index(str(index_path))
-        chunks = np.load(str(chunk_path), allow_pickle=True)
-        return index, chunks
+        return load_index_files(index_path, chunk_path)
+    except FileNotFoundError:
+        # Stale registry entry (store removed since the last scan)
+        refresh_index_registry(force=True)
+        logger.warning("⚠️ No FAISS index found for %s", doc_id)
+        return None, None
     except Exception as e:
-        print(f"❌ Failed to load FAISS for {doc_id}: {e}")
+        logger.error("❌ Failed to load FAISS for %s: %s", doc_id, e)
         return None, None
 
 
@@ -87,41 +595,72 @@ async def load_faiss_index_async(doc_id: str):
 # --------------------------------------------------------------------
 # 🔍 Query across all FAISS indices for a provider
 # --------------------------------------------------------------------
-def query_faiss_index(query_vec: np.ndarray, provider_dir: str, top_k: int = 3):
+_SEARCH_POOL = None
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    global _SEARCH_POOL
+    if _SEARCH_POOL is None:
+        _SEARCH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                          thread_name_prefix="faiss-search")
+    return _SEARCH_POOL
+
+
+def query_faiss_index(query_vec: np.ndarray, provider_dir: str, top_k: int = 3,
+                      preset: str | None = None):
     """
     Search all FAISS documents in a provider’s directory.
+    query_vec: (1, dim) C-contiguous float32; normalized in place if not unit length.
+    preset: optional SEARCH_PRESETS key ("fast" / "accurate").
     """
     provider_dir = Path(provider_dir)
     if not provider_dir.exists():
-        print(f"⚠️ Provider directory not found: {provider_dir}")
+        logger.warning("⚠️ Provider directory not found: %s", provider_dir)
         return []
 
-    all_results = []
-    faiss.normalize_L2(query_vec)
-
-    for fname in os.listdir(provider_dir):
-        if not fname.endswith(".index"):
-            continue
+    normalize_rows(query_vec)
 
-        doc_id = fname.replace(".index", "")
+    def _search_doc(doc_id):
         index_path = provider_dir / f"{doc_id}.index"
-        chunk_path = provider_dir / f"{doc_id}_chunks.npy"
-
-        index, chunks = load_faiss_index(doc_id)
-        if index is None or chunks is None:
-            continue
-
-        D, I = index.search(query_vec, top_k)
-        for score, idx in zip(D[0], I[0]):
-            if 0 <= idx < len(chunks):
-                all_results.append({
-                    "doc_id": doc_id,
-                    "score": float(1 - score / 2),
-                    "text": chunks[idx]
-                })
+        chunk_path = provider_dir / f"{doc_id}_chunks.bin"
+        try:
+            index, chunks = load_index_files(index_path, chunk_path)
+        except Exception as e:
+            logger.error("❌ Failed to load FAISS for %s: %s", doc_id, e)
+            return None
+
+        D, I = search(index, query_vec, top_k, preset)
+        scores, ids = to_similarity(index, D[0]), I[0]
+        valid = (ids >= 0) & (ids < len(chunks))
+        return doc_id, chunks, scores[valid], ids[valid]
+
+    with os.scandir(provider_dir) as entries:
+        doc_ids = [e.name[:-len(".index")] for e in entries if e.name.endswith(".index")]
+
+    # Usually one store per provider; older per-document stores are
+    # searched concurrently (single-threaded FAISS calls, GIL released).
+    if len(doc_ids) > 1:
+        hits = list(_get_search_pool().map(_search_doc, doc_ids))
+    else:
+        hits = [_search_doc(doc_id) for doc_id in doc_ids]
+    hits = [h for h in hits if h is not None and len(h[3])]
+    if not hits:
+        return []
 
-    all_results.sort(key=lambda x: x["score"], reverse=True)
-    return all_results[:top_k]
+    # Merge in NumPy: rank all candidate scores at once and build
+    # result dicts (and decode chunk text) only for the final top_k.
+    scores = np.concatenate([h[2] for h in hits])
+    ids = np.concatenate([h[3] for h in hits])
+    store_of = np.repeat(np.arange(len(hits)), [len(h[3]) for h in hits])
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [
+        {
+            "doc_id": hits[store_of[i]][0],
+            "score": float(scores[i]),
+            "text": hits[store_of[i]][1][ids[i]],
+        }
+        for i in order
+    ]
 
 
 # --------------------------------------------------------------------
@@ -135,14 +674,15 @@ def list_providers(base_dir: Path = BASE_INDEX_DIR):
     if not base_dir.exists():
         return providers
 
-    for provider_id in os.listdir(base_dir):
-        provider_path = base_dir / provider_id
-        if not provider_path.is_dir():
-            continue
+    # scandir: DirEntry.is_dir() uses the dirent type, no per-entry stat.
+    with os.scandir(base_dir) as entries:
+        provider_dirs = [e for e in entries if e.is_dir(follow_symlinks=False)]
 
-        docs = [f.replace(".index", "") for f in os.listdir(provider_path) if f.endswith(".index")]
+    for provider in provider_dirs:
+        with os.scandir(provider.path) as entries:
+            docs = [e.name[:-len(".index")] for e in entries if e.name.endswith(".index")]
         providers.append({
-            "provider_id": provider_id,
+            "provider_id": provider.name,
             "documents": docs,
             "doc_count": len(docs)
         })
@@ -156,7 +696,7 @@ def inspect_index(provider_id: str, verbose: bool = False):
     """
     base_dir = f"app/data/faiss_store/{provider_id}"
     index_path = os.path.join(base_dir, f"{provider_id}.index")
-    chunk_path = os.path.join(base_dir, f"{provider_id}_chunks.npy")
+    chunk_path = os.path.join(base_dir, f"{provider_id}_chunks.bin")
 
     if not os.path.exists(index_path):
         raise FileNotFoundError(f"Index file not found: {index_path}")
@@ -166,12 +706,12 @@ def inspect_index(provider_id: str, verbose: bool = False):
 
     summary = {
         "index_file": index_path,
-        "chunk_file": os.path.exists(chunk_path),
+        "chunk_file": chunks_exist(chunk_path),
         "vector_count": n_vectors
     }
 
-    if verbose and os.path.exists(chunk_path):
-        chunks = np.load(chunk_path, allow_pickle=True).tolist()
-        summary["preview"] = chunks[:3]  # first 3 text snippets
+    if verbose and chunks_exist(chunk_path):
+        chunks = read_chunks(chunk_path)
+        summary["preview"] = [str(c) for c in chunks[:3]]  # first 3 text snippets
 
     return summary
\ No newline at end of file
@@ -1,13 +1,15 @@
 # app/risk/orchestrator.py
 import asyncio
 import json
+import os
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
 
 from app.risk.scoring import compute_scores_from_watchlists
 from app.risk.watchlist_simulator import simulate_all_watchlists
-from app.services.application_store import load_applications, save_all
+from app.services.application_store import index_applications, load_applications, save_all
+from app.services import json_utils
 from app.services.risk_model_client import call_risk_model  # ✅ new module using Azure Key Vault secrets
 
 # optional imports (not required for risk model call)
@@ -19,10 +21,38 @@ except ImportError:
 # ============================================================
 # 📁 Directories
 # ============================================================
+# Created on first write, not at import
 RISK_DIR = Path("app/data/risk")
-RISK_DIR.mkdir(parents=True, exist_ok=True)
 RISK_HISTORY_DIR = Path("app/data/risk_history")
-RISK_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+WATCHLIST_DIR = Path("app/mock_data/watchlists")
+# (threshold, level), highest first; anything at or below 40 is "Low"
+RISK_LEVELS = ((70, "High"), (40, "Moderate"))
+
+WATCHLIST_CATEGORIES = (
+    "cybersecurity", "data_privacy", "financial",
+    "operational", "regulatory", "reputation", "supplychain",
+)
+
+
+async def _load_watchlist(provider_dir: Path, cat: str):
+    """Reads one watchlist JSON off the event loop; None if missing."""
+    try:
+        raw = await asyncio.to_thread((provider_dir / f"{cat}.json").read_bytes)
+    except FileNotFoundError:
+        print(f"⚠️ Missing watchlist file for {cat}")
+        return None
+    return json_utils.loads(raw)
+
+
+def _write_risk_snapshot(provider_id: str, model_response: dict) -> Path:
+    """Writes the dashboard snapshot via tmp + os.replace (never half-written)."""
+    RISK_DIR.mkdir(parents=True, exist_ok=True)
+    risk_file = RISK_DIR / f"{provider_id}.json"
+    tmp_file = risk_file.with_suffix(".json.tmp")
+    tmp_file.write_bytes(json_utils.dumps(model_response, indent=True))
+    os.replace(tmp_file, risk_file)
+    return risk_file
+
 
 # ============================================================
 # 🧠 Evaluate Provider Risk (via fine-tuned model)
@@ -34,10 +64,7 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
     """
 
     apps = load_applications()
-    record = next(
-        (r for r in apps if r.get("id") == provider_id or r.get("application_id") == provider_id),
-        None,
-    )
+    record = index_applications(apps).get(provider_id)
     if not record:
         print(f"❌ No record found for provider {provider_id}")
         return None
@@ -62,7 +89,7 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
     await simulate_all_watchlists(provider_id)
 
     # Confirm files exist
-    provider_dir = Path("app/mock_data/watchlists") / provider_id
+    provider_dir = WATCHLIST_DIR / provider_id
     print(f"📁 Watchlist directory: {provider_dir}  Exists? {provider_dir.exists()}")
 
 
@@ -70,24 +97,20 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
     # 1️⃣ Build REAL model payload from actual watchlist JSONs
     # ============================================================
     watchlist_categories = []
-    provider_dir = Path("app/mock_data/watchlists") / provider_id
+    provider_dir = WATCHLIST_DIR / provider_id
 
+    # Read all category files concurrently, off the event loop
+    raw = await asyncio.gather(*(_load_watchlist(provider_dir, cat) for cat in WATCHLIST_CATEGORIES))
 
-    for cat in [
-        "cybersecurity", "data_privacy", "financial",
-        "operational", "regulatory", "reputation", "supplychain"
-    ]:
-        file_path = provider_dir / f"{cat}.json"
-        if file_path.exists():
-            data = json.loads(file_path.read_text())
+    for data in raw:
+        if data is None:
+            continue
 
-            # 🔧 normalize to match what model prompt builder expects
-            note = data.get("note") or data.get("raw_simulated", {}).get("note", "")
-            data["note"] = note
+        # 🔧 normalize to match what model prompt builder expects
+        note = data.get("note") or data.get("raw_simulated", {}).get("note", "")
+        data["note"] = note
 
-            watchlist_categories.append(data)
-        else:
-            print(f"⚠️ Missing watchlist file for {cat}")
+        watchlist_categories.append(data)
 
 
     # Build payload for the model
@@ -125,7 +148,7 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
         # risk_model_client returns string or dict
         if isinstance(raw_result, str):
             try:
-                model_output = json.loads(raw_result)
+                model_output = json_utils.loads(raw_result)
             except:
                 print("⚠️ Model returned non-JSON. Using fallback explanations only.")
                 model_output = {}
@@ -155,6 +178,8 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
     # 4️⃣ Merge deterministic scores + model explanations
     # ============================================================
     final_categories = {}
+    score_total = 0.0
+    wl_notes = {c["category"]: c["note"] for c in watchlist_categories}  # one file per category
 
     for cat, score in det_scores.items():
 
@@ -162,7 +187,7 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
         # 1) model_expl[cat]
         # 2) model_cat_scores[cat]['note']
         # 3) watchlist[data]['note']
-        wl_note = next((c["note"] for c in watchlist_categories if c["category"] == cat), "")
+        wl_note = wl_notes.get(cat, "")
 
         if model_expl and cat in model_expl:
             note = model_expl[cat]
@@ -173,18 +198,13 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
             note = wl_note or "No explanation available."
 
         final_categories[cat] = {"score": score, "note": note}
+        score_total += score
 
     # ============================================================
     # 5️⃣ Compute final aggregated score
     # ============================================================
-    aggregated_score = round(sum(v["score"] for v in final_categories.values()) / len(final_categories), 1)
-
-    if aggregated_score > 70:
-        risk_level = "High"
-    elif aggregated_score > 40:
-        risk_level = "Moderate"
-    else:
-        risk_level = "Low"
+    aggregated_score = round(score_total / len(final_categories), 1)
+    risk_level = next((level for limit, level in RISK_LEVELS if aggregated_score > limit), "Low")
 
     confidence = model_output.get("confidence", 0.0)
 
@@ -225,13 +245,13 @@ async def evaluate_provider(provider_id: str) -> Dict[str, Any]:
         "note": f"Model returned {risk_level} with confidence {confidence}",
     })
 
-    save_all(apps)
+    # Disk writes run on worker threads so concurrent evaluations overlap
+    await asyncio.to_thread(save_all, apps)
 
     # ============================================================
     # 5️⃣ Save risk snapshot to disk for dashboard
     # ============================================================
-    risk_file = RISK_DIR / f"{provider_id}.json"
-    risk_file.write_text(json.dumps(model_response, indent=2))
+    risk_file = await asyncio.to_thread(_write_risk_snapshot, provider_id, model_response)
     print(f"💾 Risk file saved: {risk_file}")
 
     print(f"✅ [Pipeline] Risk evaluation completed for {provider_id} → {risk_level} ({aggregated_score}%)")
@@ -248,46 +268,38 @@ def convert_payload_to_text_prompt(payload: dict) -> str:
     Convert the canonical payload into the YAML-like text prompt
     your finetuned model expects.
     """
-    lines = []
-    lines.append("Category-wise risk factors:")
-    lines.append(f"provider_name: {payload.get('provider_name', '')}")
-    lines.append(f"license_number: {payload.get('license_number', '')}")
-    lines.append("watchlists:")
+    lines = [
+        "Category-wise risk factors:",
+        f"provider_name: {payload.get('provider_name', '')}",
+        f"license_number: {payload.get('license_number', '')}",
+        "watchlists:",
+    ]
+    append = lines.append
     for cat in payload.get("watchlist_categories", []):
         # hits
         hits = cat.get("hits", 0)
-        lines.append(f"- {cat.get('category')}: {hits} hits")
-        lines.append("  entries:")
+        append(f"- {cat.get('category')}: {hits} hits")
+        append("  entries:")
         entries = cat.get("entries", []) or []
         if not entries:
-            lines.append("    []")
-        else:
-            for e in entries:
-                # use common keys if present (case-insensitive)
-                idv = e.get("id") or e.get("ID") or e.get("Id") or ""
-                title = e.get("title") or e.get("Title") or ""
-                detail = e.get("detail") or e.get("Detail") or e.get("description") or ""
-                severity = e.get("severity") or e.get("Severity") or ""
-                source = e.get("source") or e.get("Source") or ""
-                timestamp = e.get("timestamp") or e.get("Timestamp") or ""
-                if idv:
-                    lines.append(f"    - ID: {idv}")
-                if title:
-                    lines.append(f"      Title: {title}")
-                if detail:
-                    lines.append(f"      Detail: {detail}")
-                if severity != "":
-                    lines.append(f"      Severity: {severity}")
-                if source:
-                    lines.append(f"      Source: {source}")
-                if timestamp:
-                    lines.append(f"      Timestamp: {timestamp}")
+            append("    []")
+        for e in entries:
+            # use common keys if present (case-insensitive)
+            fields = (
+                ("    - ID", e.get("id") or e.get("ID") or e.get("Id")),
+                ("      Title", e.get("title") or e.get("Title")),
+                ("      Detail", e.get("detail") or e.get("Detail") or e.get("description")),
+                ("      Severity", e.get("severity") or e.get("Severity")),
+                ("      Source", e.get("source") or e.get("Source")),
+                ("      Timestamp", e.get("timestamp") or e.get("Timestamp")),
+            )
+            lines.extend(f"{label}: {value}" for label, value in fields if value)
         note = cat.get("note", "")
         # escape quotes
         note_escaped = note.replace('"', "'")
-        lines.append(f"  note: \"{note_escaped}\"")
-        lines.append("")  # blank line
-    lines.append(f"web_research: '{payload.get('web_research', '')}'")
-    lines.append(f"doc_summary: '{payload.get('doc_summary', '')}'")
-    lines.append("Produce JSON as specified.")
+        append(f"  note: \"{note_escaped}\"")
+        append("")  # blank line after each category
+    append(f"web_research: '{payload.get('web_research', '')}'")
+    append(f"doc_summary: '{payload.get('doc_summary', '')}'")
+    append("Produce JSON as specified.")
     return "\n".join(lines)
@@ -1,10 +1,17 @@
 # app/risk/payload_builder.py
 import json
+import logging
+import os
+from functools import lru_cache
 from pathlib import Path
-from app.services.application_store import load_applications
+from app.services.application_store import find_application
+from app.services import json_utils
+
+logger = logging.getLogger(__name__)
 
 # Real location of watchlist data
 BASE_WATCHLIST_DIR = Path("app/mock_data/watchlists")
+WATCHLIST_CACHE_SIZE = 4096  # parsed (provider, category, signature) entries
 
 CANONICAL = [
     "cybersecurity",
@@ -28,17 +35,28 @@ def load_watchlist_json(provider_id: str, category: str):
             "note": "...",
             "hits": int
         }
+    Parsed results are cached per file signature; treat them as read-only.
     """
 
-    folder = BASE_WATCHLIST_DIR / provider_id
-    file = folder / f"{category}.json"
+    file = BASE_WATCHLIST_DIR / provider_id / f"{category}.json"
 
-    if not file.exists():
-        print(f"⚠️ No watchlist file for provider='{provider_id}' category='{category}' → {file}")
+    try:
+        st = os.stat(file)
+    except FileNotFoundError:
+        logger.warning("⚠️ No watchlist file for provider='%s' category='%s' → %s", provider_id, category, file)
         return {"entries": [], "note": "", "hits": 0}
 
+    return _load_watchlist_cached(provider_id, category, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=WATCHLIST_CACHE_SIZE)
+def _load_watchlist_cached(provider_id: str, category: str, mtime_ns: int, size: int):
+    """Parses one watchlist file; (mtime_ns, size) in the key invalidates stale entries."""
+    file = BASE_WATCHLIST_DIR / provider_id / f"{category}.json"
+
     try:
-        raw = json.loads(file.read_text())
+        data = file.read_bytes()
+        raw = json_utils.loads(data)
 
         # Most of your real JSON files contain a list of entries directly
         if isinstance(raw, list):
@@ -63,13 +81,8 @@ def load_watchlist_json(provider_id: str, category: str):
 
         note = extract_note(entries[0]) if entries else ""
 
-        # DEBUG LOG
-        print(f"\n=== WATCHLIST READ: provider={provider_id} category={category} ===")
-        print(f"File: {file}")
-        print(f"Hits: {hits}")
-        print(f"Note: {note[:200]}")
-        print("Entries preview:", json.dumps(entries[:2], indent=2))
-        print("=========================================================\n")
+        logger.debug("📄 Watchlist read: provider=%s category=%s file=%s hits=%s note=%.200s",
+                     provider_id, category, file, hits, note)
 
         return {
             "entries": entries,
@@ -78,7 +91,7 @@ def load_watchlist_json(provider_id: str, category: str):
         }
 
     except Exception as e:
-        print(f"❌ ERROR reading watchlist at {file}: {e}")
+        logger.error("❌ ERROR reading watchlist at %s: %s", file, e)
         return {"entries": [], "note": "", "hits": 0}
 
 
@@ -87,11 +100,7 @@ def build_model_payload(provider_id: str):
     Builds the final payload sent to the Risk Model.
     """
 
-    apps = load_applications()
-    record = next(
-        (r for r in apps if r.get("id") == provider_id or r.get("application_id") == provider_id),
-        None
-    )
+    record = find_application(provider_id)  # cached, read-only
     if not record:
         raise ValueError(f"No provider record found for {provider_id}")
 
@@ -122,9 +131,8 @@ def build_model_payload(provider_id: str):
         "watchlist_categories": watchlist_categories,
     }
 
-    # FINAL DEBUG LOG
-    print("\n======= FINAL PAYLOAD TO RISK MODEL =======")
-    print(json.dumps(payload, indent=2)[:3000])
-    print("==========================================\n")
+    # Only serialize the preview when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📦 Final payload to risk model:\n%s", json.dumps(payload, indent=2)[:3000])
 
     return payload
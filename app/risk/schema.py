@@ -1,5 +1,6 @@
 # app/risk/schema.py
-from jsonschema import validate, ValidationError
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import best_match
 
 MODEL_PAYLOAD_SCHEMA = {
     "type": "object",
@@ -28,9 +29,13 @@ MODEL_PAYLOAD_SCHEMA = {
     }
 }
 
+# Checked and compiled once; jsonschema.validate() redoes both per call
+Draft7Validator.check_schema(MODEL_PAYLOAD_SCHEMA)
+_VALIDATOR = Draft7Validator(MODEL_PAYLOAD_SCHEMA)
+
+
 def validate_payload(payload: dict):
-    try:
-        validate(instance=payload, schema=MODEL_PAYLOAD_SCHEMA)
+    error = best_match(_VALIDATOR.iter_errors(payload))  # same error validate() raises
+    if error is None:
         return True, None
-    except ValidationError as e:
-        return False, str(e)
+    return False, str(error)
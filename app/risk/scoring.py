@@ -2,6 +2,8 @@
 
 from typing import Dict, Any, List
 
+import numpy as np
+
 CANONICAL = [
     "cybersecurity",
     "data_privacy",
@@ -12,43 +14,42 @@ CANONICAL = [
     "supplychain"
 ]
 
+BASE_SCORE = 20.0
+SEVERITY_FACTOR = 40.0
+MAX_SCORE = 100.0
+
+
 def compute_scores_from_watchlists(watchlist_categories: List[Dict[str, Any]]) -> Dict[str, float]:
     """
     Deterministic scoring based on real watchlist severity.
     Scoring rule:
         - base score = 20
         - add severity_sum * 40 (tunable)
+    Severities of all categories are summed in one NumPy pass.
     """
-    scores = {}
-
-    for cat in watchlist_categories:
-        name = cat.get("category")
-        entries = cat.get("entries", []) or []
-
-        severities = [
-            e.get("severity", 0.0)
-            for e in entries
-            if isinstance(e, dict)
-        ]
-        severity_sum = sum(severities)
-
-        # BASE SCORE
-        base = 20.0
-
-        # If no entries -> base score was correct
-        if severities:
-            score = base + (severity_sum * 40.0)
-        else:
-            score = base
-
-        # Clamp 0–100
-        if score > 100:
-            score = 100.0
-
-        scores[name] = round(score, 1)
+    names = []
+    owner = []       # category position of each severity
+    severities = []
+    for pos, cat in enumerate(watchlist_categories):
+        names.append(cat.get("category"))
+        for e in cat.get("entries", []) or []:
+            if isinstance(e, dict):
+                owner.append(pos)
+                severities.append(e.get("severity", 0.0))
+
+    n = len(names)
+    owner = np.asarray(owner, dtype=np.intp)
+    severity_sum = np.bincount(owner, weights=np.asarray(severities, dtype=np.float64), minlength=n)
+    has_entries = np.bincount(owner, minlength=n) > 0
+
+    # If no entries -> base score; clamp to 100
+    raw = np.where(has_entries, BASE_SCORE + severity_sum * SEVERITY_FACTOR, BASE_SCORE)
+    raw = np.minimum(raw, MAX_SCORE)
+
+    scores = {name: round(score, 1) for name, score in zip(names, raw.tolist())}
 
     # Ensure all canonical categories exist
     for c in CANONICAL:
-        scores.setdefault(c, 20.0)
+        scores.setdefault(c, BASE_SCORE)
 
     return scores
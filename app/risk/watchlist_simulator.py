@@ -1,11 +1,12 @@
 import asyncio
+import hashlib
 import random
-import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 
-from app.services.application_store import load_applications
+from app.services.application_store import find_application
+from app.services import json_utils
 
 # -------------------------------------------------------------------------
 # Directory where all watchlist files are stored
@@ -23,15 +24,16 @@ CATEGORIES = [
     "supplychain",
 ]
 
+def _stable_seed(text: str) -> int:
+    """Run-independent seed (hash() is salted per process via PYTHONHASHSEED)."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
 # =============================================================================
 # 🔧 Get provider_name + license_number
 # =============================================================================
 def get_provider_details(provider_id: str):
-    apps = load_applications()
-    rec = next(
-        (r for r in apps if r.get("id") == provider_id or r.get("application_id") == provider_id),
-        None
-    )
+    rec = find_application(provider_id)  # indexed, read-only record
     if not rec:
         raise ValueError(f"❌ Provider not found: {provider_id}")
 
@@ -42,26 +44,31 @@ def get_provider_details(provider_id: str):
 # =============================================================================
 # 🔧 FULL SIMULATOR (writes JSON files to disk)
 # =============================================================================
-async def simulate_watchlist(provider_id: str, category: str) -> Dict[str, Any]:
+async def simulate_watchlist(provider_id: str, category: str, details=None) -> Dict[str, Any]:
     """
     Main simulator used by orchestrator.
     Generates realistic watchlist entries and writes JSON files per category:
     app/mock_data/watchlists/<provider_id>/<category>.json
+    details: optional (provider_name, license_number), looked up if omitted.
     """
 
-    provider_name, license_number = get_provider_details(provider_id)
+    if details is None:
+        details = await asyncio.to_thread(get_provider_details, provider_id)
+    provider_name, license_number = details
 
-    # Stable random seed so same provider → consistent results
-    random.seed(hash(provider_id + category))
+    # Stable random seed so same provider → consistent results.
+    # Private generator: the categories run concurrently and would
+    # otherwise reseed / consume the shared module-level RNG.
+    rng = random.Random(_stable_seed(provider_id + category))
 
-    await asyncio.sleep(random.uniform(0.05, 0.15))
+    await asyncio.sleep(rng.uniform(0.05, 0.15))
 
     # 10–15% chance of hits
     entries = []
-    if random.random() < 0.15:
-        for _ in range(random.randint(1, 3)):
+    if rng.random() < 0.15:
+        for _ in range(rng.randint(1, 3)):
             entries.append({
-                "severity": random.choice([0.1, 0.3, 0.5, 0.8]),
+                "severity": rng.choice([0.1, 0.3, 0.5, 0.8]),
                 "detail": f"Simulated {category} issue for {provider_name}",
                 "timestamp": datetime.utcnow().isoformat(),
                 "source": f"simulated_{category}_watchlist"
@@ -94,7 +101,8 @@ async def simulate_watchlist(provider_id: str, category: str) -> Dict[str, Any]:
 
     # Write category JSON file
     file_path = provider_dir / f"{category}.json"
-    file_path.write_text(json.dumps(result, indent=2))
+    data = json_utils.dumps(result, indent=True)
+    await asyncio.to_thread(file_path.write_bytes, data)
 
     print(f"📁 [Watchlist Saved] {file_path} — Hits: {len(entries)}")
     return result
@@ -138,8 +146,10 @@ async def simulate_all_watchlists(provider_id: str):
     Writes JSON files for each category.
     """
 
+    # Resolve the provider once, then run all categories concurrently
+    details = await asyncio.to_thread(get_provider_details, provider_id)
     tasks = [
-        simulate_watchlist(provider_id, category)
+        simulate_watchlist(provider_id, category, details)
         for category in CATEGORIES
     ]
     return await asyncio.gather(*tasks)
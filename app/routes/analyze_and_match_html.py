@@ -6,6 +6,8 @@ from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from datetime import datetime
 import tempfile
+import asyncio
+import os
 
 # Core AI services
 from app.services.parser import parse_provider_license
@@ -13,6 +15,7 @@ from app.services.registry_matcher import match_provider
 
 # Reuse utilities
 from app.routes.upload import generate_temp_id
+from app.rag.router import _copy_upload  # chunked upload → disk copy
 from app.services.application_store import upsert_application  # centralized persistence
 
 router = APIRouter()
@@ -44,14 +47,13 @@ async def analyze_and_match_html(request: Request, file: UploadFile = File(...))
         # ----------------------------------------------------------
         # 1️⃣ Save uploaded file temporarily
         # ----------------------------------------------------------
-        contents = await file.read()
-        if not contents:
+        # Streamed in UPLOAD_COPY_CHUNK pieces on a worker thread (never held in RAM whole)
+        fd, temp_pdf_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        await asyncio.to_thread(_copy_upload, file.file, temp_pdf_path)
+        if not os.path.getsize(temp_pdf_path):
             return HTMLResponse("<h3>❌ Uploaded file is empty.</h3>", status_code=400)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(contents)
-            temp_pdf_path = tmp.name
-
         print(f"📂 Uploaded PDF saved to temporary path: {temp_pdf_path}")
 
         # ----------------------------------------------------------
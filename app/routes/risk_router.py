@@ -12,8 +12,7 @@ from app.services.application_store import load_applications, save_all
 from app.rag.ingest import ingest_text_block
 router = APIRouter(tags=["Risk Intelligence"])
 
-RISK_DIR = Path("app/data/risk")
-RISK_DIR.mkdir(parents=True, exist_ok=True)
+RISK_DIR = Path("app/data/risk")  # created on first write
 
 # ============================================================
 # 1️⃣ CALCULATE / UPDATE PROVIDER RISK (MAIN ORCHESTRATOR ENTRY)
@@ -245,6 +244,7 @@ async def calculate_provider_risk(provider_id: str, internal: bool = False):
         print(f"✅ Risk evaluation complete for {provider_id} — Score: {aggregated_score}")
 
         # --- Save orchestrator output snapshot ---
+        RISK_DIR.mkdir(parents=True, exist_ok=True)
         (RISK_DIR / f"{provider_id}.json").write_text(json.dumps(result, indent=2))
 
         # --- 🧠 Build contextual summary text for FAISS embedding ---
@@ -4,7 +4,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 from app.services.id_utils import generate_temp_id  # ✅ isolated utility (no circular import)
-from threading import Lock
+from app.services import json_utils
+from threading import RLock
 
 # ============================================================
 # ⚙️ Path setup
@@ -12,8 +13,13 @@ from threading import Lock
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "applications.json"
 DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-# Thread-safe file operations
-_LOCK = Lock()
+# Thread-safe file operations (re-entrant: read-modify-write helpers
+# hold it across load_applications() + save)
+_LOCK = RLock()
+
+# id → record index for find_application(), rebuilt when the
+# file's (mtime_ns, size) signature changes
+_INDEX: Dict = {"sig": None, "by_id": {}}
 
 # ============================================================
 # 🧩 Internal Utilities
@@ -46,6 +52,18 @@ def _normalize_id(rec: Dict) -> str:
     return rec["id"]
 
 
+_DEFAULT_FIELDS = ("status", "provider", "documents", "created_at", "messages", "history")
+
+
+def _needs_heal(rec: Dict) -> bool:
+    """True if _normalize_id / _ensure_defaults would change the record."""
+    return (
+        not rec.get("id")
+        or not rec.get("application_id")
+        or any(k not in rec for k in _DEFAULT_FIELDS)
+    )
+
+
 def _ensure_defaults(rec: Dict) -> None:
     """Assign safe defaults to missing fields."""
     rec.setdefault("status", "Under Review")
@@ -59,49 +77,64 @@ def _ensure_defaults(rec: Dict) -> None:
 def _atomic_write(path: Path, data: List[Dict]):
     """Perform atomic file write with a temporary backup."""
     tmp_path = path.with_suffix(".tmp")
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    tmp_path.write_bytes(json_utils.dumps(data, indent=True))
     os.replace(tmp_path, path)
 
 
+def _file_sig():
+    st = os.stat(DATA_PATH)
+    return st.st_mtime_ns, st.st_size
+
+
 # ============================================================
 # 📘 Load / Save
 # ============================================================
 
 def load_applications() -> List[Dict]:
     """Read and normalize application records from disk."""
+    return _read_applications()[0]
+
+
+def _read_applications():
+    """load_applications() plus whether it rewrote the file (reset / auto-heal)."""
     if not DATA_PATH.exists():
         print("📄 No applications.json found — initializing empty dataset.")
-        return []
+        return [], False
 
     try:
         with _LOCK:
-            with open(DATA_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-    except json.JSONDecodeError:
+            raw = DATA_PATH.read_bytes()
+        data = json_utils.loads(raw)
+    except (json.JSONDecodeError, ValueError):
         print(f"⚠️ Corrupted JSON detected in {DATA_PATH}, resetting file.")
         _atomic_write(DATA_PATH, [])
-        return []
+        return [], True
     except Exception as e:
         print(f"⚠️ Error reading {DATA_PATH}: {e}")
-        return []
+        return [], False
 
     normalized = []
+    healed = False
     for rec in data:
         if not isinstance(rec, dict):
+            healed = True
             continue
-        _normalize_id(rec)
-        _ensure_defaults(rec)
+        if _needs_heal(rec):
+            _normalize_id(rec)
+            _ensure_defaults(rec)
+            healed = True
         normalized.append(rec)
 
-    # Auto-heal invalid records on load
+    # Auto-heal invalid records on load (only if something was fixed)
     try:
-        _atomic_write(DATA_PATH, normalized)
+        if healed:
+            with _LOCK:
+                _atomic_write(DATA_PATH, normalized)
     except Exception as e:
         print(f"⚠️ Failed to rewrite normalized applications: {e}")
 
     print(f"📂 Loaded {len(normalized)} application(s).")
-    return normalized
+    return normalized, healed
 
 
 def save_all(apps: List[Dict]):
@@ -186,12 +219,52 @@ def upsert_application(record: Dict, key_fields=("provider_name", "license_numbe
 # 🔍 Utility Finders
 # ============================================================
 
-def find_application(app_id: str) -> Optional[Dict]:
-    """Retrieve a single record by ID or application_id."""
-    apps = load_applications()
+def index_applications(apps: List[Dict]) -> Dict[str, Dict]:
+    """Map both `id` and `application_id` to their record (`id` wins on clashes)."""
+    by_id = {}
     for rec in apps:
-        if rec.get("id") == app_id or rec.get("application_id") == app_id:
-            return rec
+        by_id.setdefault(rec.get("application_id"), rec)
+        by_id[rec.get("id")] = rec
+    return by_id
+
+
+def _snapshot() -> Dict:
+    """Parses applications.json only when its signature changed."""
+    with _LOCK:
+        sig = _file_sig()  # before reading: a concurrent write leaves it stale
+        if _INDEX["sig"] != sig:
+            apps, rewrote = _read_applications()
+            if rewrote:
+                sig = _file_sig()  # our own reset / auto-heal write
+            _INDEX["by_id"] = index_applications(apps)
+            _INDEX["sig"] = sig
+        return _INDEX
+
+
+def find_application(app_id: str) -> Optional[Dict]:
+    """
+    Retrieve a single record by ID or application_id.
+    Served from an in-memory index while applications.json is unchanged;
+    treat the returned record as read-only (use the update helpers).
+    """
+    if not DATA_PATH.exists():
+        return None
+    return _snapshot()["by_id"].get(app_id)
+
+
+def add_documents(app_id: str, documents: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Append document metadata to a record in one locked read-modify-write.
+    Returns the record's full document list, or None if not found.
+    """
+    with _LOCK:
+        apps = load_applications()
+        for rec in apps:
+            if rec.get("id") == app_id or rec.get("application_id") == app_id:
+                rec.setdefault("documents", []).extend(documents)
+                _atomic_write(DATA_PATH, apps)
+                return rec["documents"]
+    print(f"⚠️ No record found for document append: {app_id}")
     return None
 
 
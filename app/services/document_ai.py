@@ -2,12 +2,16 @@
 
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
-from app.config.settings import AZURE_ENDPOINT, AZURE_KEY
+from functools import lru_cache
+from app.config import settings
 
-client = DocumentAnalysisClient(
-    endpoint=AZURE_ENDPOINT,
-    credential=AzureKeyCredential(AZURE_KEY)
-)
+
+@lru_cache(maxsize=1)
+def get_client() -> DocumentAnalysisClient:
+    return DocumentAnalysisClient(
+        endpoint=settings.AZURE_ENDPOINT,
+        credential=AzureKeyCredential(settings.AZURE_KEY)
+    )
 
 def analyze_document(file_bytes: bytes):
     """
@@ -17,7 +21,7 @@ def analyze_document(file_bytes: bytes):
       - raw_text: single concatenated string for downstream regex parsing
     """
     try:
-        poller = client.begin_analyze_document("prebuilt-document", document=file_bytes)
+        poller = get_client().begin_analyze_document("prebuilt-document", document=file_bytes)
         result = poller.result()
 
         extracted = {}
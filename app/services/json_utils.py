@@ -0,0 +1,21 @@
+# app/services/json_utils.py
+import json
+
+# orjson parses bytes directly and is several times faster when installed
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def loads(data):
+    """Parses JSON from bytes or str."""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serializes to UTF-8 bytes; indent=True gives two-space indentation."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
@@ -0,0 +1,51 @@
+# app/services/openai_client.py
+
+import threading
+import httpx
+from openai import AsyncAzureOpenAI
+from app.config import settings
+
+# ------------------------------------------------------------
+# Shared Azure OpenAI client (built once on first use, then reused)
+# ------------------------------------------------------------
+OPENAI_MAX_RETRIES = 3
+OPENAI_TIMEOUT = httpx.Timeout(45.0, connect=5.0)
+OPENAI_MAX_CONNECTIONS = 64    # async pool; ≥ concurrent embed batches + /ask streams
+
+_ASYNC_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _client_kwargs(max_retries: int = OPENAI_MAX_RETRIES) -> dict:
+    return {
+        "api_key": settings.OPENAI_KEY,
+        "api_version": settings.OPENAI_API_VERSION,
+        "azure_endpoint": settings.OPENAI_ENDPOINT,
+        "max_retries": max_retries,
+        "timeout": OPENAI_TIMEOUT,
+    }
+
+
+def open_async_openai_client(max_retries: int = OPENAI_MAX_RETRIES) -> AsyncAzureOpenAI:
+    """
+    A new async client with its own connection pool. Use for work that
+    runs in a private event loop (asyncio.run on a helper thread).
+    Pass max_retries=0 when the caller runs its own retry loop.
+    """
+    return AsyncAzureOpenAI(
+        **_client_kwargs(max_retries),
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS),
+            timeout=OPENAI_TIMEOUT,
+        ),
+    )
+
+
+def get_async_openai_client() -> AsyncAzureOpenAI:
+    """Bound to the server's event loop; don't use from asyncio.run() helpers."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _ASYNC_CLIENT is None:
+                _ASYNC_CLIENT = open_async_openai_client()
+    return _ASYNC_CLIENT
@@ -5,13 +5,32 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
+import asyncio
 import os
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+
+# ----------------------------------------------------------
+# 📝 Logging (request threads only enqueue; one thread writes)
+# ----------------------------------------------------------
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+logging.basicConfig(level=LOG_LEVEL, format="%(message)s", handlers=[QueueHandler(_log_queue)])
+# Chatty third-party loggers: httpx logs every OpenAI request, azure-core's
+# http_logging_policy logs request headers
+for _name in ("httpx", "azure"):
+    logging.getLogger(_name).setLevel(logging.WARNING)
+_log_listener.start()
 
 # ----------------------------------------------------------
 # 🌐 Import Core Modules
 # ----------------------------------------------------------
 from app.rag.ask_api import router as ask_router
 from app.rag.router import router as rag_router
+from app.rag.pdf_text import shutdown_extract_pool
 
 from app.routes import (
     upload,
@@ -84,8 +103,17 @@ app.include_router(risk_router.router, prefix="/risk", tags=["Risk Intelligence"
 # ----------------------------------------------------------
 # 🧠 Startup / Shutdown Events
 # ----------------------------------------------------------
+# Worker threads behind asyncio.to_thread (ingests, FAISS searches,
+# file I/O). Python's default caps at min(32, cpu + 4).
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
+
+
 @app.on_event("startup")
 async def on_startup():
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="worker")
+    )
+
     print("\n" + "=" * 80)
     print("🚀 PROVIDER GPT BACKEND STARTED")
     print(f"🕒 {datetime.utcnow().isoformat()} UTC")
@@ -100,18 +128,14 @@ async def on_startup():
     # -----------------------------------------------
     # 🔐 INITIALIZE RISK MODEL CLIENT HERE
     # -----------------------------------------------
-    from azure.identity import DefaultAzureCredential
-    from azure.keyvault.secrets import SecretClient
+    from app.config import settings
     from app.services.risk_model_client import init_client
 
-    print("🔐 Fetching Risk Model secrets from Azure Key Vault...")
-
-    KEYVAULT_URL = "https://providergpt-kv.vault.azure.net/"
-    credential = DefaultAzureCredential()
-    secret_client = SecretClient(vault_url=KEYVAULT_URL, credential=credential)
+    print("🔐 Fetching secrets from Azure Key Vault (parallel)...")
+    await asyncio.to_thread(settings.preload, ("riskModelEndpoint", "riskModelKey"))
 
-    risk_model_endpoint = secret_client.get_secret("riskModelEndpoint").value
-    risk_model_key = secret_client.get_secret("riskModelKey").value
+    risk_model_endpoint = settings.get_secret("riskModelEndpoint")
+    risk_model_key = settings.get_secret("riskModelKey")
     print("🔍 DEBUG: risk_model_endpoint =", risk_model_endpoint)
     print("🔍 DEBUG: risk_model_key =", risk_model_key[:6] + "********")
 
@@ -126,6 +150,8 @@ async def on_startup():
 @app.on_event("shutdown")
 async def on_shutdown():
     print("🧩 Graceful shutdown: releasing any in-memory state / connections.")
+    shutdown_extract_pool()
+    _log_listener.stop()  # flushes queued records
 
 
 # ----------------------------------------------------------
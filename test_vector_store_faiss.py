@@ -0,0 +1,100 @@
+import json
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.rag import vector_store_faiss as vsf
+
+DIM = 32
+
+
+def _unit_vectors(n, seed=0):
+    rng = np.random.default_rng(seed)
+    v = rng.standard_normal((n, DIM)).astype("float32")
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    return v
+
+
+@pytest.fixture
+def small_tiers(monkeypatch):
+    # Shrink the tier boundaries so every tier builds in milliseconds
+    monkeypatch.setattr(vsf, "EXACT_MAX_VECTORS", 100)
+    monkeypatch.setattr(vsf, "IVF_MAX_VECTORS", 400)
+    monkeypatch.setattr(vsf, "HNSW_MAX_VECTORS", 800)
+    monkeypatch.setattr(vsf, "GPU_MIN_VECTORS", 10**12)
+
+
+@pytest.mark.parametrize("n, index_class", [
+    (50, "IndexScalarQuantizer"),
+    (300, "IndexIVFScalarQuantizer"),
+    (600, "IndexHNSWSQ"),
+    (1200, "IndexIVFPQ"),
+])
+def test_each_tier_loads_mapped_and_searches(tmp_path, small_tiers, n, index_class):
+    vectors = _unit_vectors(n)
+    chunks = [f"chunk {i}" for i in range(n)]
+    vsf.save_faiss_index(vectors.copy(), chunks, "doc", str(tmp_path))
+
+    index, loaded = vsf.load_index_files(tmp_path / "doc.index", tmp_path / "doc_chunks.bin")
+    assert type(faiss.downcast_index(index)).__name__ == index_class
+    assert index.ntotal == n and len(loaded) == n
+
+    results = vsf.query_faiss_index(vectors[:1].copy(), str(tmp_path), top_k=3)
+    assert results and all(r["text"].startswith("chunk ") for r in results)
+    if index_class != "IndexIVFPQ":  # PQ codes are too coarse to pin the exact hit
+        assert results[0]["text"] == "chunk 0"
+
+
+def test_append_grows_store(tmp_path):
+    vsf.save_faiss_index(_unit_vectors(10), [f"a{i}" for i in range(10)], "doc", str(tmp_path))
+    vsf.append_faiss_index(_unit_vectors(5, seed=1), [f"b{i}" for i in range(5)], "doc", str(tmp_path))
+
+    index, chunks = vsf.load_index_files(tmp_path / "doc.index", tmp_path / "doc_chunks.bin")
+    assert index.ntotal == 15 and chunks[14] == "b4"
+
+
+def test_append_to_inconsistent_store_raises_and_keeps_data(tmp_path):
+    from app.rag.chunk_store import append_chunks
+
+    vsf.save_faiss_index(_unit_vectors(10), [f"a{i}" for i in range(10)], "doc", str(tmp_path))
+    append_chunks(["orphan"], tmp_path / "doc_chunks.bin")  # chunks written, index write "crashed"
+
+    with pytest.raises(RuntimeError, match="inconsistent"):
+        vsf.append_faiss_index(_unit_vectors(5, seed=1), [f"b{i}" for i in range(5)], "doc", str(tmp_path))
+
+    index = faiss.read_index(str(tmp_path / "doc.index"))
+    assert index.ntotal == 10
+
+
+def test_append_across_tier_boundary_rebuilds(tmp_path, small_tiers):
+    vsf.save_faiss_index(_unit_vectors(80), [f"a{i}" for i in range(80)], "doc", str(tmp_path))
+    vsf.append_faiss_index(_unit_vectors(60, seed=1), [f"b{i}" for i in range(60)], "doc", str(tmp_path))
+
+    index, chunks = vsf.load_index_files(tmp_path / "doc.index", tmp_path / "doc_chunks.bin")
+    assert type(faiss.downcast_index(index)).__name__ == "IndexIVFScalarQuantizer"
+    assert index.ntotal == 140 and len(chunks) == 140
+
+
+def test_ivf_store_retrains_after_doubling(tmp_path, small_tiers):
+    vsf.save_faiss_index(_unit_vectors(120), [f"a{i}" for i in range(120)], "doc", str(tmp_path))
+    vsf.append_faiss_index(_unit_vectors(40, seed=1), [f"b{i}" for i in range(40)], "doc", str(tmp_path))
+    params = json.loads((tmp_path / "doc.params.json").read_text())
+    assert params["built_for"] == 120  # plain add below the retrain threshold
+
+    vsf.append_faiss_index(_unit_vectors(100, seed=2), [f"c{i}" for i in range(100)], "doc", str(tmp_path))
+    params = json.loads((tmp_path / "doc.params.json").read_text())
+    assert params["built_for"] == 260
+
+
+def test_normalize_rows_leaves_unit_batch_untouched(monkeypatch):
+    calls = []
+    monkeypatch.setattr(vsf.faiss, "normalize_L2", lambda v: calls.append(v))
+    vectors = _unit_vectors(64)
+    before = vectors.copy()
+
+    vsf.normalize_rows(vectors)
+    assert not calls and np.array_equal(vectors, before)
+
+    vsf.normalize_rows(vectors * 3)
+    assert len(calls) == 1